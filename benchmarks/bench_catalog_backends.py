@@ -0,0 +1,79 @@
+"""
+Compare catalog lookup latency across backends.
+
+    python benchmarks/bench_catalog_backends.py [sizes]
+
+sizes is a comma-separated list of catalog sizes (default 1000,100000,1000000).
+Each query is timed through the two calls the search tool makes:
+match_products() for the query, then recommend() on its matches. load_s
+covers loading the catalog and building its recommender (warm()).
+Google Sheets is not included: it needs credentials and a live sheet, and its
+cost is the download that the in-memory backends only pay once per refresh.
+"""
+import os, statistics, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crewai_flow.tools.catalog_backends import FileBackend, SQLiteBackend
+from fixtures import make_products, write_csv, QUERIES
+
+ROUNDS = 20
+
+
+def _summary(samples):
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+def time_queries(backend):
+    match_samples, recommend_samples = [], []
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            start = time.perf_counter()
+            matches, _ = backend.match_products(query)
+            match_samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            backend.recommend(matches)
+            recommend_samples.append(time.perf_counter() - start)
+    match_p50, match_p95 = _summary(match_samples)
+    recommend_p50, recommend_p95 = _summary(recommend_samples)
+    return {
+        "match_p50_ms": match_p50,
+        "match_p95_ms": match_p95,
+        "recommend_p50_ms": recommend_p50,
+        "recommend_p95_ms": recommend_p95,
+    }
+
+
+def report(name, size, load, result):
+    print(f"{name:<8} {size:>9} {load:>8.2f} {result['match_p50_ms']:>10.3f} {result['match_p95_ms']:>10.3f} "
+          f"{result['recommend_p50_ms']:>10.3f} {result['recommend_p95_ms']:>10.3f}")
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "1000,100000,1000000").split(",")]
+    print(f"{'backend':<8} {'rows':>9} {'load_s':>8} {'match_p50':>10} {'match_p95':>10} "
+          f"{'rec_p50':>10} {'rec_p95':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            products = make_products(size)
+
+            csv_path = os.path.join(tmp, f"catalog_{size}.csv")
+            write_csv(csv_path, products)
+            backend = FileBackend(csv_path)
+            start = time.perf_counter()
+            backend.warm()  # load, index and build the recommender once, as the first search would
+            load = time.perf_counter() - start
+            report("csv", size, load, time_queries(backend))
+            del backend
+
+            start = time.perf_counter()
+            backend = SQLiteBackend.build(os.path.join(tmp, f"catalog_{size}.db"), products)
+            backend.warm()
+            load = time.perf_counter() - start
+            report("sqlite", size, load, time_queries(backend))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Worker startup time and memory: a parsed in-memory catalog per worker
+versus one shared mmap snapshot.
+
+    python benchmarks/bench_catalog_snapshot.py [rows] [workers]
+
+Each worker process opens the catalog, runs the benchmark queries with
+their recommendations and reports its private (RssAnon) and file-backed
+(RssFile) resident memory. A parsed worker builds its own recommender on
+the first query; an mmap worker maps the vectors stored in the snapshot.
+File-backed pages of the snapshot are shared by all workers through the
+page cache, so only the private part grows with the worker count (Linux only).
+"""
+import csv, multiprocessing, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crewai_flow.tools.catalog_snapshot import MmapSnapshot, write_snapshot
+from crewai_flow.tools.recommender import Recommender
+from crewai_flow.tools.search_index import SearchIndex
+from fixtures import make_products, write_csv, QUERIES
+
+
+def rss_kb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+
+def worker(mode, path, results):
+    start = time.perf_counter()
+    if mode == "mmap":
+        catalog = MmapSnapshot(path)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            catalog = SearchIndex(list(csv.DictReader(f)))
+    startup = time.perf_counter() - start
+    start = time.perf_counter()
+    recommender = None
+    for query in QUERIES:
+        matches = catalog.match(query)
+        if matches:
+            if recommender is None:
+                recommender = catalog.recommender if mode == "mmap" else Recommender(catalog.products)
+            recommender.similar(recommender.ids[i] for i in matches)
+    results.put((mode, startup, time.perf_counter() - start, rss_kb()))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    products = make_products(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"parsed": os.path.join(tmp, "catalog.csv"), "mmap": os.path.join(tmp, "catalog.snap")}
+        write_csv(paths["parsed"], products)
+        start = time.perf_counter()
+        write_snapshot(paths["mmap"], products)
+        print(f"snapshot of {rows} rows written in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(paths['mmap']) / 1e6:.1f} MB)")
+
+        context = multiprocessing.get_context("spawn")
+        print(f"{'mode':<7} {'workers':>7} {'startup_s':>10} {'queries_s':>10} {'anon_MB/worker':>15} {'file_MB/worker':>15}")
+        for mode in ("parsed", "mmap"):
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(mode, paths[mode], results)) for _ in range(workers)]
+            for process in processes:
+                process.start()
+            reports = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            startup = max(report[1] for report in reports)
+            queries = max(report[2] for report in reports)
+            anon = sum(report[3].get("RssAnon", 0) for report in reports) / len(reports) / 1024
+            file_backed = sum(report[3].get("RssFile", 0) for report in reports) / len(reports) / 1024
+            print(f"{mode:<7} {workers:>7} {startup:>10.2f} {queries:>10.2f} {anon:>15.1f} {file_backed:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare a full catalog reload with a delta sync on an offline FakeWorksheet.
+
+    python benchmarks/bench_catalog_sync.py [rows] [edits]
+
+Reports the cells read (a proxy for Sheets API quota), the wall time and
+rows synced per refresh, and checks the synced index against a full rebuild
+after edits and appends, and again after rows are deleted and inserted
+mid-sheet (which falls back to a full reload).
+"""
+import os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crewai_flow.tools.catalog_backends import SheetsBackend
+from crewai_flow.tools.search_index import SearchIndex
+from fixtures import FakeWorksheet, make_products, QUERIES
+
+HEADER = ["id", "name", "category", "price", "description", "updated_at"]
+
+
+def make_sheet(count):
+    rows = [[p[key] for key in HEADER[:-1]] + [0] for p in make_products(count)]
+    return FakeWorksheet(HEADER, rows)
+
+
+def edit(sheet, rng, count, edits):
+    for n in range(edits):
+        position = rng.randrange(count)
+        row = sheet._values[position + 1]
+        sheet.update_row(position, row[:3] + [f"{float(row[3]) + 1:.2f}", row[4], n + 1])
+    sheet.append_row([f"NEW{count}", "Nordic Rattan Sofa", "Seating", "999", "New in.", 1])
+
+
+def reshuffle(sheet, rng, count):
+    """Delete and insert rows above the end of the sheet, shifting the rows below them."""
+    for _ in range(3):
+        sheet.delete_row(rng.randrange(count // 2))
+    sheet.insert_row(rng.randrange(count // 2), [f"INS{count}", "Walnut Side Table", "Tables", "149", "Inserted.", 1])
+
+
+def check(backend, label):
+    synced = {query: backend.search(query) for query in QUERIES}
+    rebuilt = SearchIndex(backend.load_products())
+    for query in QUERIES:
+        assert synced[query] == rebuilt.search(query), f"{label} diverged on '{query}'"
+
+
+def refresh(backend, sheet, label):
+    cells, deltas = sheet.cells_read, backend.cache.stats["delta_syncs"]
+    start = time.perf_counter()
+    backend.cache.refresh()
+    elapsed = time.perf_counter() - start
+    delta = backend.cache.stats["delta_syncs"] > deltas
+    print(f"{label:<22} {sheet.cells_read - cells:>10} {elapsed * 1000:>10.1f} "
+          f"{backend.cache.stats['last_rows_synced'] if delta else 'full':>8}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    rng = random.Random(7)
+    sheet = make_sheet(count)
+    backend = SheetsBackend(worksheet=sheet)
+    backend.cache.snapshot()
+
+    print(f"{'refresh':<22} {'cells_read':>10} {'ms':>10} {'synced':>8}")
+    refresh(backend, sheet, "unchanged (delta)")
+    edit(sheet, rng, count, edits)
+    refresh(backend, sheet, f"{edits + 1} rows (delta)")
+
+    cells = sheet.cells_read
+    start = time.perf_counter()
+    backend.load_products()
+    print(f"{'full reload':<22} {sheet.cells_read - cells:>10} {(time.perf_counter() - start) * 1000:>10.1f} {count + 1:>8}")
+    check(backend, "delta sync")
+
+    reshuffle(sheet, rng, count)
+    refresh(backend, sheet, "deletes/insert (full)")
+    check(backend, "sync after deletes and an insert")
+    print("synced index matches a full rebuild")
+
+
+if __name__ == "__main__":
+    main()
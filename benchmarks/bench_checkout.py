@@ -0,0 +1,69 @@
+"""
+Checkouts per second through CheckoutService against a local Stripe stand-in.
+
+    docker run --rm -p 12111:12111 stripe/stripe-mock
+    python benchmarks/bench_checkout.py [--checkouts 200] [--concurrency 1,10,50]
+
+Every checkout is a distinct cart owner, so idempotency keys never collapse
+requests. Reports throughput and p50/p95/p99 latency per concurrency level.
+"""
+import argparse, asyncio, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_checkout import CheckoutService
+from crewai_flow.crew_metrics import percentile
+from crewai_flow.crew_state import CartItem
+
+CART = [
+    CartItem(product_id="P0000001", name="Nordic Oak Sofa 1", unit_price_cents=89900, quantity=1),
+    CartItem(product_id="P0000002", name="Glass Floor Lamp 2", unit_price_cents=12950, quantity=2),
+]
+
+
+async def run_level(service: CheckoutService, checkouts: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, failures = [], 0
+
+    async def checkout(number):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            session = await service.create_session(CART, "http://localhost:8000/checkout/success",
+                                                   "http://localhost:8000/checkout/cancel", owner=f"bench-{concurrency}-{number}")
+            samples.append(time.perf_counter() - start)
+            if session is None:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(checkout(number) for number in range(checkouts)))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(samples)
+    return {
+        "concurrency": concurrency,
+        "checkouts_per_s": checkouts / elapsed,
+        "p50_ms": percentile(ordered, 0.5) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "failures": failures,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated levels")
+    parser.add_argument("--api-base", default=os.getenv("STRIPE_API_BASE", "http://localhost:12111"))
+    parser.add_argument("--api-key", default="sk_test_123", help="stripe-mock accepts any test key")
+    args = parser.parse_args()
+
+    service = CheckoutService(api_key=args.api_key, api_base=args.api_base)
+    print(f"{'concurrency':>11} {'checkouts/s':>12} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'failures':>9}")
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        result = await run_level(service, args.checkouts, concurrency)
+        print(f"{result['concurrency']:>11} {result['checkouts_per_s']:>12.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['failures']:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+End-to-end benchmark of ShoppingFlow that runs offline.
+
+    python benchmarks/bench_flow.py [--sessions 1,10,100] [--llm-latency 0.05]
+                                    [--json results.json] [--max-p95-ms 500]
+                                    [--turn-timeout 30]
+
+Every session plays the same scripted conversation (search, refine, add,
+update, a free-form search that goes through the crew, view cart, checkout)
+through ShoppingFlow.interaction_agent. The crews run for real, on a stub LLM
+with a fixed per-call latency; the catalog is a synthetic CSV and Chainlit
+messages are recorded instead of sent. Turn latency percentiles and
+throughput are reported per concurrency level; --max-p95-ms makes the run
+exit non-zero when any level is slower, for use in CI. A turn that takes
+longer than --turn-timeout stops the run with a non-zero exit instead of
+letting it hang.
+"""
+import argparse, asyncio, contextlib, json, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fixtures import make_products, write_csv
+
+# crewAI's telemetry posts to a remote collector on every crew run; offline, each
+# post waits for its timeout and the turns measure that instead of the flow
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+# The shared catalog is created when crewai_flow is imported, so point it at the fixture first
+CATALOG_SIZE = 2000
+_catalog_dir = tempfile.mkdtemp(prefix="bench-flow-")
+os.environ["CATALOG_BACKEND"] = "csv"
+os.environ["CATALOG_PATH"] = os.path.join(_catalog_dir, "catalog.csv")
+write_csv(os.environ["CATALOG_PATH"], make_products(CATALOG_SIZE))
+
+import chainlit
+
+
+class RecordedMessage:
+    """Stands in for chainlit.Message outside a Chainlit session."""
+    sent = 0
+
+    def __init__(self, content="", **kwargs):
+        self.content = content
+
+    async def send(self):
+        RecordedMessage.sent += 1
+        return self
+
+    async def update(self):
+        return self
+
+
+chainlit.Message = RecordedMessage
+
+from crewai_flow.crews.shopping_crew.shopping_crew import ShoppingCrew
+from crewai_flow.crew_shopping_flow import ShoppingFlow
+from crewai_flow.crew_pipeline import warm_pipeline
+from crewai_flow.crew_query_cache import query_cache
+from crewai_flow.crew_metrics import percentile
+from stub_llm import StubLLM
+
+SEARCHES = ["sofa", "dining table", "floor lamp", "wardrobe", "stool", "bed frame", "desk", "cabinet"]
+REFINES = ["oak sofa", "glass dining table", "steel floor lamp", "pine wardrobe",
+           "rattan stool", "walnut bed frame", "compact desk", "marble cabinet"]
+# Free-form requests the router sends to the crew (the stub LLM searches for the last word)
+CREW_SEARCHES = ["what would be a comfy sofa", "show me a cheap reading lamp",
+                 "i need somewhere to keep my shoes, maybe a cabinet", "show me a nice coffee table"]
+
+
+class TurnTimeout(Exception):
+    pass
+
+
+async def run_session(number: int, samples: list, turn_timeout: float):
+    flow = ShoppingFlow()
+
+    async def say(text):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(flow.interaction_agent(RecordedMessage(text)), turn_timeout)
+        except asyncio.TimeoutError:
+            raise TurnTimeout(f"session {number}: '{text}' took longer than {turn_timeout}s") from None
+        samples.append(time.perf_counter() - start)
+
+    await say(SEARCHES[number % len(SEARCHES)])
+    await say(f"refine {REFINES[number % len(REFINES)]}")
+    products = flow.available_products()
+    if products:
+        name = products[0]["name"]
+        await say(f"add {name}")
+        await say(f"update {name} 3")
+    await say(CREW_SEARCHES[number % len(CREW_SEARCHES)])
+    await say("view cart")
+    await say("checkout")
+
+
+async def run_level(sessions: int, turn_timeout: float) -> dict:
+    # Every level starts cold, so it does not just replay the previous level's cached searches
+    query_cache.clear()
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(number, samples, turn_timeout) for number in range(sessions)))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(samples)
+    return {
+        "sessions": sessions,
+        "turns": len(ordered),
+        "p50_ms": percentile(ordered, 0.5) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "turns_per_s": len(ordered) / elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="1,10,100", help="comma-separated concurrency levels")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stub LLM call")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any level's p95 turn latency is higher")
+    parser.add_argument("--turn-timeout", type=float, default=30.0, help="fail if any turn takes longer (seconds)")
+    args = parser.parse_args()
+
+    llm = StubLLM(latency=args.llm_latency)
+    ShoppingCrew.llm = llm
+
+    results = []
+    # Agents run verbose; keep their transcripts out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        await asyncio.to_thread(warm_pipeline)
+        warm_s = time.perf_counter() - start
+        try:
+            for sessions in (int(level) for level in args.sessions.split(",")):
+                results.append(await run_level(sessions, args.turn_timeout))
+        except TurnTimeout as e:
+            # Crews still running in worker threads fail on their next LLM call, so the process can exit
+            llm.max_calls = 0
+            timed_out = e
+        else:
+            timed_out = None
+
+    if timed_out:
+        print(f"{timed_out}; stopping after {llm.calls} stub LLM calls")
+        sys.exit(1)
+
+    print(f"crews warmed in {warm_s:.2f}s; {llm.calls} stub LLM calls, {RecordedMessage.sent} messages")
+    print(f"{'sessions':>8} {'turns':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'turns/s':>9}")
+    for result in results:
+        print(f"{result['sessions']:>8} {result['turns']:>6} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['turns_per_s']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"llm_latency": args.llm_latency, "results": results}, f, indent=2)
+    if args.max_p95_ms is not None:
+        slow = [result for result in results if result["p95_ms"] > args.max_p95_ms]
+        if slow:
+            print(f"p95 above {args.max_p95_ms}ms at {[result['sessions'] for result in slow]} sessions")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
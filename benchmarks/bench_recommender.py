@@ -0,0 +1,74 @@
+"""
+Compare the ranked recommender with the old "whole matched category" recommendations.
+
+    python benchmarks/bench_recommender.py [sizes]
+
+sizes is a comma-separated list of catalog sizes (default 1000,10000,100000).
+For each size it reports the recommender's build time, its query latency and
+the JSON size of the recommendations a search hands to the agent, before and
+after. The top-k scores are also checked against a dense NumPy computation.
+"""
+import json, os, statistics, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+from crewai_flow.tools.search_index import SearchIndex
+from crewai_flow.tools.recommender import Recommender, RECOMMEND_TOP_K
+from fixtures import make_products, QUERIES
+
+ROUNDS = 20
+
+
+def dense_scores(recommender, ids):
+    """Every product's similarity to ids, from full dense vectors, as a check."""
+    rows = len(recommender)
+    matrix = np.zeros((rows, int(recommender._cols.max()) + 1))
+    row_of = np.repeat(np.arange(rows), np.diff(recommender._row_ptr))
+    matrix[row_of, recommender._cols] = recommender._data
+    positions = [recommender.position[pid] for pid in ids]
+    scores = matrix @ matrix[positions].sum(axis=0)
+    scores[positions] = 0
+    return scores
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000,100000").split(",")]
+    print(f"{'rows':>7} {'build_s':>8} {'p50_ms':>8} {'p95_ms':>8} {'old_recs':>9} {'old_kb':>9} {'new_kb':>7}")
+    for size in sizes:
+        products = make_products(size)
+        index = SearchIndex(products)
+
+        start = time.perf_counter()
+        recommender = Recommender(index.products)
+        build = time.perf_counter() - start
+
+        samples, old_counts, old_bytes, new_bytes = [], [], [], []
+        for query in QUERIES:
+            matching, same_category, _ = index.search(query)
+            if not matching:
+                continue
+            ids = [p["id"] for p in matching]
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                top = recommender.similar(ids, RECOMMEND_TOP_K)
+                samples.append(time.perf_counter() - start)
+            old_counts.append(len(same_category))
+            old_bytes.append(len(json.dumps(same_category)))
+            new_bytes.append(len(json.dumps(index.resolve(top))))
+            if size <= 10000 and len(ids) <= 50:
+                # Compared by score: near-ties may round either way
+                scores = dense_scores(recommender, ids)
+                expected = np.sort(scores)[::-1][:RECOMMEND_TOP_K]
+                got = scores[[recommender.position[pid] for pid in top]]
+                assert np.allclose(got, expected, atol=1e-5), f"top-k diverged from the dense computation on '{query}'"
+
+        samples.sort()
+        print(f"{size:>7} {build:>8.2f} {statistics.median(samples) * 1000:>8.3f} "
+              f"{samples[int(len(samples) * 0.95)] * 1000:>8.3f} {statistics.mean(old_counts):>9.0f} "
+              f"{statistics.mean(old_bytes) / 1024:>9.1f} {statistics.mean(new_bytes) / 1024:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure cold start: how long a fresh process takes to import the app and greet the first user.
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 8]
+
+Each run is a new interpreter that imports crewai_flow.main, runs the
+on_chat_start handler (Chainlit messages are recorded instead of sent) and
+then answers one catalog search. Reported per scenario, as medians:
+
+    import_s         importing crewai_flow.main
+    first_message_s  process start to the welcome message
+    first_search_s   process start to the first search result
+    heavy            which of crewai, gspread, stripe and numpy were loaded by the import
+
+The "eager" scenario imports those packages up front, as the app did before
+they were deferred. The slowest top-level imports of a lazy run without the
+warm-up are listed from python -X importtime.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fixtures import make_products, write_csv
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+HEAVY = ("crewai", "gspread", "stripe", "numpy")
+
+CHILD = r"""
+import asyncio, json, os, sys, time
+start = time.perf_counter()
+if os.environ.get("BENCH_EAGER") == "1":
+    import crewai, gspread, stripe, numpy
+    import crewai_flow.crew_pipeline
+import chainlit
+import crewai_flow.main as app
+imported = time.perf_counter()
+heavy = [name for name in %(heavy)r if name in sys.modules]
+
+
+class RecordedMessage:
+    # Stands in for chainlit.Message outside a Chainlit session
+    def __init__(self, content="", **kwargs):
+        self.content = content
+
+    async def send(self):
+        return self
+
+
+async def main():
+    chainlit.Message = RecordedMessage
+    app.session_key = lambda: "bench"
+    await app.start()
+    greeted = time.perf_counter()
+    flow = await app.sessions.get_async("bench")
+    await flow.search_query("sofa", stream=False)
+    searched = time.perf_counter()
+    print(json.dumps({
+        "import_s": imported - start,
+        "first_message_s": greeted - start,
+        "first_search_s": searched - start,
+        "heavy": heavy,
+    }))
+
+asyncio.run(main())
+""" % {"heavy": HEAVY}
+
+SCENARIOS = {
+    "lazy, warm-up": {"SHOPPING_WARMUP": "true"},
+    "lazy, no warm-up": {"SHOPPING_WARMUP": "false"},
+    "eager": {"SHOPPING_WARMUP": "true", "BENCH_EAGER": "1"},
+}
+
+
+def run(env, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    result = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(stderr, top):
+    """Top-level modules by cumulative import time, from -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and not name.startswith(" ") and "." not in name:
+            entries.append((int(cumulative), name))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "catalog.csv")
+        write_csv(catalog_path, make_products(2000))
+        base_env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])),
+            CATALOG_BACKEND="csv",
+            CATALOG_PATH=catalog_path,
+            SESSION_DB_PATH="",
+        )
+
+        print(f"{'scenario':<18} {'import_s':>9} {'first_message_s':>16} {'first_search_s':>15}  heavy")
+        for name, overrides in SCENARIOS.items():
+            results = [run({**base_env, **overrides})[0] for _ in range(args.runs)]
+            print(f"{name:<18} {statistics.median(r['import_s'] for r in results):>9.3f} "
+                  f"{statistics.median(r['first_message_s'] for r in results):>16.3f} "
+                  f"{statistics.median(r['first_search_s'] for r in results):>15.3f}  "
+                  f"{', '.join(results[0]['heavy']) or '-'}")
+
+        # Without the warm-up, so only what the import and first search load is listed
+        _, stderr = run({**base_env, **SCENARIOS["lazy, no warm-up"]}, importtime=True)
+        print("\nslowest top-level imports (lazy, no warm-up):")
+        for microseconds, module in slowest_imports(stderr, args.top):
+            print(f"  {module:<24} {microseconds / 1e6:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic furniture catalogs, and an offline worksheet, for the benchmarks."""
+import csv, random, re
+
+MATERIALS = ["Oak", "Walnut", "Pine", "Glass", "Steel", "Velvet", "Leather", "Rattan", "Marble", "Linen"]
+STYLES = ["Modern", "Classic", "Nordic", "Industrial", "Rustic", "Compact", "Deluxe", "Vintage"]
+ITEMS = {
+    "Seating": ["Sofa", "Armchair", "Dining Chair", "Stool", "Bench", "Recliner"],
+    "Tables": ["Coffee Table", "Dining Table", "Side Table", "Desk", "Console Table"],
+    "Lighting": ["Floor Lamp", "Table Lamp", "Pendant Light", "Wall Sconce"],
+    "Storage": ["Bookshelf", "Wardrobe", "Dresser", "Cabinet", "Shoe Rack"],
+    "Bedroom": ["Bed Frame", "Nightstand", "Mattress", "Headboard"],
+}
+
+
+def make_products(count, seed=42):
+    """count catalog rows shaped like the FurnitureProducts sheet, deterministic per seed."""
+    rng = random.Random(seed)
+    categories = list(ITEMS)
+    products = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        item = rng.choice(ITEMS[category])
+        # A model number keeps names unique, so "add <name>" always resolves
+        name = f"{rng.choice(STYLES)} {rng.choice(MATERIALS)} {item} {i}"
+        products.append({
+            "id": f"P{i:07d}",
+            "name": name,
+            "category": category,
+            "price": round(rng.uniform(20, 2500), 2),
+            "description": f"A {item.lower()} for any room.",
+        })
+    return products
+
+
+# Queries of varying selectivity, as shoppers type them
+QUERIES = ["sofa", "sofas", "oak dining table", "lamp", "rattan stool", "wardrobe", "velvet", "xyz"]
+
+
+def write_csv(path, products):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(products[0]))
+        writer.writeheader()
+        writer.writerows(products)
+
+
+class FakeWorksheet:
+    """
+    An in-memory stand-in for a gspread Worksheet, for running the sync offline.
+
+    Implements the read calls SheetSync makes, bumps a modification counter on
+    every edit, and counts the cells each call returns as a proxy for API quota.
+    """
+
+    def __init__(self, header, rows):
+        self._values = [list(header)] + [[str(value) for value in row] for row in rows]
+        self._modified = 0
+        self.spreadsheet = self
+        self.calls = 0
+        self.cells_read = 0
+
+    def _read(self, values):
+        self.calls += 1
+        self.cells_read += sum(len(row) if isinstance(row, list) else 1 for row in values)
+        return values
+
+    # Read API
+    def get_lastUpdateTime(self):
+        self.calls += 1
+        return str(self._modified)
+
+    def get_all_values(self):
+        return self._read([list(row) for row in self._values])
+
+    def row_values(self, row):
+        values = self._values[row - 1] if row <= len(self._values) else []
+        self._read([values])
+        return list(values)
+
+    def col_values(self, col):
+        values = [row[col - 1] if col <= len(row) else "" for row in self._values]
+        while values and values[-1] == "":
+            values.pop()
+        return self._read(values)
+
+    def batch_get(self, ranges):
+        blocks = []
+        for a1 in ranges:
+            start, end = (int(part) for part in re.fullmatch(r"(\d+):(\d+)", a1).groups())
+            blocks.append([list(row) for row in self._values[start - 1:end]])
+        self.calls += 1
+        self.cells_read += sum(len(row) for block in blocks for row in block)
+        return blocks
+
+    # Edits, as someone working in the sheet would make them
+    def update_row(self, position, values):
+        """Overwrite the data row at position (0 is the row under the header)."""
+        self._values[position + 1] = [str(value) for value in values]
+        self._modified += 1
+
+    def insert_row(self, position, values):
+        """Insert a data row at position, moving the rows from there down by one."""
+        self._values.insert(position + 1, [str(value) for value in values])
+        self._modified += 1
+
+    def append_row(self, values):
+        self._values.append([str(value) for value in values])
+        self._modified += 1
+
+    def delete_row(self, position):
+        del self._values[position + 1]
+        self._modified += 1
@@ -0,0 +1,94 @@
+"""
+A deterministic stand-in for the crew's LLM.
+
+It answers in crewai's ReAct text format: the search agent calls the
+Furniture Search Tool once and returns the tool's JSON as its final answer,
+the recommendation agent passes the JSON from its context through, and the
+interaction agent replies with a fixed sentence. Each call sleeps for a fixed
+latency to stand in for the model round trip.
+"""
+import json, os, re, sys, threading, time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_extract import parse_json_payload
+
+try:
+    from crewai import BaseLLM
+except ImportError:  # crewai releases before BaseLLM subclass the LiteLLM wrapper instead
+    from crewai import LLM as BaseLLM
+
+_QUERY = re.compile(r"Search for a product (.+?) in the attached", re.S)
+_WORD = re.compile(r"[a-z]+")
+
+
+def _text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def _observed_payload(text: str):
+    """
+    The JSON payload of the latest tool result, or None.
+
+    The ReAct instructions say "Observation:" too, and crewAI appends them to
+    a tool result every few tool uses, so walk back over the observations
+    until one is followed by a payload.
+    """
+    position = text.rfind("Observation:")
+    while position != -1:
+        observed = parse_json_payload(text[position:])
+        if observed is not None:
+            return observed
+        position = text.rfind("Observation:", 0, position)
+    return None
+
+
+class StubLLM(BaseLLM):
+    def __init__(self, latency: float = 0.05, max_calls: Optional[int] = None):
+        super().__init__(model="stub/shopping")
+        self.latency = latency
+        # A crew that never reaches a final answer fails once this many calls are spent, instead of hanging
+        self.max_calls = max_calls
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> str:
+        with self._lock:
+            self.calls += 1
+            if self.max_calls is not None and self.calls > self.max_calls:
+                raise RuntimeError(f"stub LLM called more than {self.max_calls} times")
+        time.sleep(self.latency)
+        text = _text(messages)
+
+        observed = _observed_payload(text)
+        if observed is not None:
+            # The search tool has answered; hand its payload back unchanged
+            return f"Thought: I now know the final answer\nFinal Answer: {json.dumps(observed)}"
+
+        query = _QUERY.search(text)
+        if query and "Furniture Search Tool" in text:
+            # Like a model would, boil a conversational request down to its product word
+            words = _WORD.findall(query.group(1).lower())
+            tool_query = words[-1] if words else query.group(1)
+            return (
+                "Thought: I should search the catalog\n"
+                "Action: Furniture Search Tool\n"
+                f"Action Input: {json.dumps({'query': tool_query})}"
+            )
+
+        payload = parse_json_payload(text)
+        if payload is not None and "Recommendation Agent" in text:
+            return f"Thought: I now know the final answer\nFinal Answer: {json.dumps(payload)}"
+        return "Thought: I now know the final answer\nFinal Answer: Here is what I found for you."
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 8192
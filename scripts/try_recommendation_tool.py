@@ -0,0 +1,50 @@
+"""
+Try the category recommendation tool against the configured catalog.
+
+    python scripts/try_recommendation_tool.py [category]
+"""
+import json, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pydantic import BaseModel
+from crewai_flow.tools.catalog_backends import catalog
+
+
+# Assuming you've already defined your RecommendationTool and RecommendationToolInput
+
+class RecommendationToolInput(BaseModel):
+    recommendation_pref: str
+
+class RecommendationTool:
+    name = "Furniture Recommendation Tool"
+    description = (
+        "A tool to search for furniture products from a Google Sheet based on product category."
+        "It retrieves relevant products and returns their details."
+    )
+    args_schema = RecommendationToolInput
+
+    def recommend_by_category(self, category: str) -> str:
+        try:
+            # Filter products by category (case-insensitive), in whichever catalog backend is configured
+            matching_products = catalog.by_category(category)
+        
+        except Exception as e:
+            return f"Error fetching products from the catalog: {str(e)}"
+
+        if matching_products:
+            return json.dumps({"recommended_products": matching_products})
+        else:
+            return json.dumps({
+                "recommended_products": [],
+                "formatted": "No furniture products found in the database."
+            })
+
+    def _run(self, recommendation_pref: str) -> str:
+        return self.recommend_by_category(recommendation_pref)
+
+
+if __name__ == "__main__":
+    tool = RecommendationTool()
+    result = tool._run(recommendation_pref=sys.argv[1] if len(sys.argv) > 1 else "seating")
+    print("Result:", result)
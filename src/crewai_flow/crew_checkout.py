@@ -1,8 +1,11 @@
-import stripe, os
-from typing import List, Dict, Any
+import os, hashlib, json, logging
+from typing import List, Dict, Any, Optional
+from crewai_flow.crew_metrics import span
 
+logger = logging.getLogger(__name__)
+
+# stripe itself is imported on the first real checkout, not at app start
 api_key= os.getenv("STRIPE_API_KEY")
-stripe.api_key= os.getenv("STRIPE_API_KEY")
 
 
 # FOR PODUCTION, STRIPE SESSION
@@ -60,9 +63,8 @@ def create_checkout_session(cart_items: List, success_url: str, cancel_url: str)
     # Build a query string with cart items
     items_param = []
     for item in cart_items:
-        product = item.product
-        name = product.get('name', 'Unknown')
-        price = product.get('price', 0)
+        name = item.name or 'Unknown'
+        price = item.unit_price
         quantity = item.quantity
         items_param.append(f"{name}:{price}:{quantity}")
     
@@ -72,3 +74,108 @@ def create_checkout_session(cart_items: List, success_url: str, cancel_url: str)
     checkout_url = f"{success_url}?items={items_str}"
     
     return checkout_url
+
+
+# Which checkout handle_checkout runs: "simulated" (the development flow
+# above) or "stripe" (real Checkout Sessions through CheckoutService).
+CHECKOUT_MODE = os.getenv("CHECKOUT_MODE", "simulated")
+if CHECKOUT_MODE not in ("simulated", "stripe"):
+    raise ValueError(f"CHECKOUT_MODE must be 'simulated' or 'stripe', got '{CHECKOUT_MODE}'")
+# Point at a local Stripe stand-in such as stripe-mock (http://localhost:12111)
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE")
+STRIPE_TIMEOUT_SECONDS = float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10"))
+# Retries of failed or timed-out requests, with Stripe's exponential backoff
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+
+
+def cart_idempotency_key(owner: str, cart_items: List, attempt: int = 0) -> str:
+    """
+    The same key for the same owner, cart contents and checkout attempt.
+
+    Checking out the same cart twice (a double click, a retry after a
+    timeout) then returns the session Stripe already created instead of a
+    second one; any change to the cart gives a new key. Stripe keeps a key
+    for 24 hours, so once a session is paid or expired the caller moves on
+    to the next attempt to get a new one.
+    """
+    lines = sorted((item.product_id, item.unit_price_cents, item.quantity) for item in cart_items)
+    digest = hashlib.sha256(json.dumps([owner, attempt, lines]).encode("utf-8")).hexdigest()
+    return f"checkout-{digest[:40]}"
+
+
+class CheckoutService:
+    """
+    Creates Stripe Checkout Sessions without blocking the event loop.
+
+    One StripeClient, backed by a pooled HTTPX async client, is shared by all
+    sessions so connections are reused; each request has a timeout, bounded
+    retries and an idempotency key for its cart snapshot.
+    """
+
+    def __init__(self, api_key: str = api_key, api_base: str = STRIPE_API_BASE,
+                 timeout: float = STRIPE_TIMEOUT_SECONDS, max_retries: int = STRIPE_MAX_RETRIES):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import stripe
+            self._client = stripe.StripeClient(
+                self.api_key,
+                base_addresses={"api": self.api_base} if self.api_base else {},
+                http_client=stripe.HTTPXClient(timeout=self.timeout),
+                max_network_retries=self.max_retries,
+            )
+        return self._client
+
+    @staticmethod
+    def line_items(cart_items: List) -> List[Dict[str, Any]]:
+        return [
+            {
+                "price_data": {
+                    "currency": "usd",
+                    "product_data": {"name": item.name or "Unknown Product"},
+                    "unit_amount": item.unit_price_cents,
+                },
+                "quantity": item.quantity,
+            }
+            for item in cart_items
+        ]
+
+    async def create_session(self, cart_items: List, success_url: str, cancel_url: str, owner: str,
+                             attempt: int = 0) -> Optional[Any]:
+        """Create a Checkout Session for the cart and return it, or None if Stripe failed."""
+        import stripe
+        try:
+            with span("checkout.stripe"):
+                session = await self._get_client().v1.checkout.sessions.create_async(
+                    params={
+                        "mode": "payment",
+                        "line_items": self.line_items(cart_items),
+                        "success_url": success_url,
+                        "cancel_url": cancel_url,
+                    },
+                    options={"idempotency_key": cart_idempotency_key(owner, cart_items, attempt)},
+                )
+            return session
+        except stripe.StripeError as e:
+            logger.error("Error creating checkout session: %s", e)
+            return None
+
+    async def session_finished(self, session_id: str) -> bool:
+        """Whether the session was paid or has expired, so checking out again needs a new one."""
+        import stripe
+        try:
+            with span("checkout.stripe"):
+                session = await self._get_client().v1.checkout.sessions.retrieve_async(session_id)
+            return session.status in ("complete", "expired")
+        except stripe.StripeError as e:
+            # Assume it is still open: the same cart then gets the same session back
+            logger.warning("Could not check checkout session %s: %s", session_id, e)
+            return False
+
+
+checkout_service = CheckoutService()
@@ -1,55 +1,186 @@
-import chainlit as cl
-
-async def display_search_results(state):
-    """Helper function to display search results and recommendations consistently."""
-    if state.search_results:
-        rec_str = "Found products:\n\n"
-        for prod in state.search_results:
-            rec_str += f"- {prod.get('name', 'N/A')} | Price: ${prod.get('price', 'N/A')}\n"
-        
+import chainlit as cl, os
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from crewai_flow.crew_metrics import metrics, timed
+from crewai_flow.tools.catalog_backends import catalog
+
+# Lines per message; the rest of a list is behind a "Show more" button
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "10"))
+CART_PAGE_SIZE = int(os.getenv("CART_PAGE_SIZE", "20"))
+# A page ends early rather than grow a message past this many bytes
+MAX_MESSAGE_BYTES = int(os.getenv("MAX_MESSAGE_BYTES", "8000"))
+
+# Line templates, bound once and filled in per line shown
+_PRODUCT_LINE = "- {} | Price: ${}".format
+_CART_LINE = "- {} | Price: ${} | Quantity: {}".format
+
+FOLLOW_UP_PROMPT = (
+    "What would you like to do next?\n"
+    "Type 'refine <query>' to refine your search,\n"
+    "or 'sort price asc' / 'filter under 300' to narrow the results,\n"
+    "or 'add <product name>' to add an item to your cart,\n"
+    "or 'view cart' to see your cart,\n"
+    "or 'checkout' to proceed to checkout."
+)
+
+CART_OPTIONS = (
+    "\n\n📝 Cart Management Options:\n"
+    "- Update quantity: Type 'update <product name> <quantity>'\n"
+    "- Remove item: Type 'remove <product name>'\n"
+    "- Clear cart: Type 'clear cart'\n"
+    "\nor 'checkout' to proceed to checkout."
+)
+
+# Headings for the pages after the first
+MORE_TITLES = {
+    "results": "More products:",
+    "recommended": "More recommendations:",
+    "available": "More products:",
+    "view": "More results:",
+}
+
+
+def product_line(prod: Dict[str, Any]) -> str:
+    return _PRODUCT_LINE(prod.get('name', 'N/A'), prod.get('price', 'N/A'))
+
+
+def cart_line(item) -> str:
+    return _CART_LINE(item.name or 'N/A', item.unit_price, item.quantity)
+
+
+def render_lines(items: Sequence, render: Callable[[Any], str], max_bytes: int = MAX_MESSAGE_BYTES) -> Tuple[str, int]:
+    """Render items one per line until max_bytes; returns the text and how many items it holds (at least one)."""
+    lines, size = [], 0
+    for item in items:
+        line = render(item)
+        size += len(line.encode("utf-8")) + 1
+        if lines and size > max_bytes:
+            break
+        lines.append(line)
+    return "\n".join(lines), len(lines)
+
+
+async def send_message(content: str, actions=None):
+    metrics.observe("render.bytes", len(content.encode("utf-8")))
+    await cl.Message(content=content, actions=actions or []).send()
+
+
+async def send_page(title: str, items: Sequence, section: str, offset: int = 0,
+                    page_size: int = RESULTS_PAGE_SIZE, render: Callable[[Any], str] = product_line,
+                    resolve: Optional[Callable] = None, footer: str = "", context: Optional[dict] = None):
+    """
+    Send one page of a list, with a "Show more" action while items remain.
+
+    items may be catalog IDs, with resolve looking up the rows of this page
+    only. The action's payload names the section and the next offset, plus
+    any context display_more needs to check the list has not changed since.
+    """
+    window = items[offset:offset + page_size]
+    rows = resolve(window) if resolve else window
+    text, shown = render_lines(rows, render)
+    if shown == len(rows):
+        consumed = len(window)
+    elif resolve:
+        # The page ends at the first row left out; IDs that have left the
+        # catalog before it are skipped rather than shown later
+        consumed = list(window).index(rows[shown]["id"])
+    else:
+        consumed = shown
+    next_offset = offset + consumed
+
+    actions = []
+    if next_offset < len(items):
+        actions.append(cl.Action(
+            name="show_more",
+            label=f"Show more ({len(items) - next_offset} left)",
+            payload={"section": section, "offset": next_offset, **(context or {})},
+        ))
+    await send_message(f"{title}\n\n{text}{footer}", actions)
+
+
+@timed("render.products")
+async def display_products(ids, query=None):
+    """
+    Send just the matched products, e.g. as soon as the search tool has them.
+
+    ids must be the list the state's search_result_ids will hold, since its
+    "Show more" action pages that list.
+    """
+    await send_page("Found products:", ids, "results", resolve=catalog.resolve, context={"query": query})
+
+
+@timed("render.search_results")
+async def display_search_results(state, products_shown=False, commentary=None):
+    """
+    Helper function to display search results and recommendations consistently.
+
+    Each list is sent a page at a time. With products_shown, the product list
+    was already streamed to the user and only the recommendations, commentary
+    and follow-up prompt are sent.
+    """
+    if state.search_result_ids:
+        context = {"query": state.user_query}
+        if not products_shown and state.result_groups:
+            # A compound query: one section per requested product
+            for sub_query, ids in state.result_groups.items():
+                if ids:
+                    await send_page(f"{sub_query.title()}:", ids, f"group:{sub_query}",
+                                    resolve=catalog.resolve, context=context)
+                else:
+                    await send_message(f"{sub_query.title()}:\n\n- No matches")
+        elif not products_shown:
+            await send_page("Found products:", state.search_result_ids, "results",
+                            resolve=catalog.resolve, context=context)
+
         # Add recommended products if available
-        if hasattr(state, 'recommended_products') and state.recommended_products:
-            rec_str += "\nYou might also like:\n\n"
-            for prod in state.recommended_products:
-                rec_str += f"- {prod.get('name', 'N/A')} | Price: ${prod.get('price', 'N/A')}\n"
-        
-        await cl.Message(content=rec_str).send()
-        
+        if state.recommended_ids:
+            await send_page("You might also like:", state.recommended_ids, "recommended",
+                            resolve=catalog.resolve, context=context)
+
+        if commentary:
+            await send_message(commentary)
+
         # Always include the follow-up prompt
-        prompt = (
-            "What would you like to do next?\n"
-            "Type 'refine <query>' to refine your search,\n"
-            "or 'add <product name>' to add an item to your cart,\n"
-            "or 'view cart' to see your cart,\n"
-            "or 'checkout' to proceed to checkout."
-        )
-        await cl.Message(content=prompt).send()
+        await send_message(FOLLOW_UP_PROMPT)
         return True
     else:
-        await cl.Message(content="No products found. Please try a different search.").send()
+        await send_message("No products found. Please try a different search.")
         return False
 
 
-async def display_cart(cart):
+@timed("render.cart")
+async def display_cart(cart, offset=0):
     """Display the current cart contents with cart management options."""
     if not cart:
-        await cl.Message(content="Your cart is empty.").send()
+        await send_message("Your cart is empty.")
+        return
+
+    # The cart keeps its total up to date
+    footer = f"\n\nTotal: ${cart.subtotal:.2f}" + CART_OPTIONS
+    title = "Your cart contains:" if offset == 0 else "More of your cart:"
+    await send_page(title, list(cart.lines()), "cart", offset=offset, page_size=CART_PAGE_SIZE,
+                    render=cart_line, footer=footer)
+
+
+@timed("render.more")
+async def display_more(state, payload):
+    """Send the next page of the list a "Show more" action belongs to."""
+    section, offset = payload.get("section", ""), int(payload.get("offset", 0))
+    if section == "cart":
+        await display_cart(state.cart, offset=offset)
         return
-    
-    cart_str = "Your cart contains:\n\n"
-    total = 0
-    for item in cart:
-        price = float(item.product.get('price', 0))
-        cart_str += f"- {item.product.get('name', 'N/A')} | Price: ${price} | Quantity: {item.quantity}\n"
-        total += price * item.quantity
-    
-    cart_str += f"\nTotal: ${total:.2f}"
-    
-    # Add cart management options
-    cart_str += "\n\n📝 Cart Management Options:\n"
-    cart_str += "- Update quantity: Type 'update <product name> <quantity>'\n"
-    cart_str += "- Remove item: Type 'remove <product name>'\n"
-    cart_str += "- Clear cart: Type 'clear cart'\n"
-    cart_str += "\nor 'checkout' to proceed to checkout."
-    
-    await cl.Message(content=cart_str).send()
+    if payload.get("query") != state.user_query:
+        await send_message("Those results are from an earlier search. Search again to see more.")
+        return
+    context = {"query": state.user_query}
+    if section == "view":
+        # A sorted/filtered view is only continued while the same facets apply
+        if payload.get("facets") != state.facets.describe():
+            await send_message("The sort or filters have changed since. The latest view is shown above.")
+            return
+        context["facets"] = state.facets.describe()
+    if section.startswith("group:"):
+        title = f"More {section[len('group:'):]}:"
+    else:
+        title = MORE_TITLES.get(section, "More products:")
+    await send_page(title, state.section_ids(section), section, offset=offset,
+                    resolve=catalog.resolve, context=context)
@@ -0,0 +1,54 @@
+import json, logging
+from typing import Any, Dict, Optional
+from crewai_flow.crews.shopping_crew.models import SearchResults
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+
+
+def parse_json_payload(raw: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the first JSON object with a 'products' key in free text.
+
+    Decodes in place from each '{' onwards, so prose around the object and
+    markdown code fences need no separate stripping.
+    """
+    position = raw.find("{")
+    while position != -1:
+        try:
+            parsed, end = _decoder.raw_decode(raw, position)
+        except json.JSONDecodeError:
+            position = raw.find("{", position + 1)
+            continue
+        if isinstance(parsed, dict) and "products" in parsed:
+            return parsed
+        position = raw.find("{", end)
+    return None
+
+
+def extract_search_results(crew_output) -> Optional[Dict[str, Any]]:
+    """Return the search payload from the first task that produced one, or None."""
+    for task_output in crew_output.tasks_output:
+        # Tasks declare output_pydantic=SearchResults; use the typed result when crewai built one
+        if isinstance(task_output.pydantic, SearchResults):
+            payload = task_output.pydantic.model_dump()
+        elif isinstance(task_output.json_dict, dict) and "products" in task_output.json_dict:
+            payload = task_output.json_dict
+        else:
+            payload = parse_json_payload(task_output.raw or "")
+        if payload is not None:
+            logger.debug("Extracted %d products from crew output", len(payload["products"]))
+            return payload
+    return None
+
+
+def extract_commentary(crew_output) -> Optional[str]:
+    """The final task's prose answer, when it is not itself a search payload."""
+    if not crew_output.tasks_output:
+        return None
+    last = crew_output.tasks_output[-1]
+    raw = (last.raw or "").strip()
+    if not raw or last.pydantic is not None or parse_json_payload(raw) is not None:
+        return None
+    return raw
@@ -0,0 +1,128 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from crewai_flow.crew_state import Facets
+
+# "sort price asc", "filter under 300", "filter between 100 and 500", "filter category seating"
+_AMOUNT = r"\$?(\d+(?:\.\d+)?)"
+_SORT = re.compile(r"sort(?: by)? (price|relevance|default)(?: (asc|ascending|low|desc|descending|high))?\b.*")
+_UNDER = re.compile(rf"filter (?:under|below|max|<=?) ?{_AMOUNT}")
+_OVER = re.compile(rf"filter (?:over|above|min|>=?) ?{_AMOUNT}")
+_BETWEEN = re.compile(rf"filter (?:between )?{_AMOUNT} ?(?:and|to|-) ?{_AMOUNT}")
+_CATEGORY = re.compile(r"filter category (.+)")
+_CLEAR = ("clear filters", "filter clear", "filter none", "sort clear")
+
+FACET_HELP = (
+    "Try 'sort price asc', 'sort price desc', 'filter under 300', 'filter over 100', "
+    "'filter between 100 and 500', 'filter category seating' or 'clear filters'."
+)
+
+
+def is_facet_command(text: str) -> bool:
+    words = text.split(maxsplit=1)
+    return text in _CLEAR or (bool(words) and words[0] in ("sort", "filter"))
+
+
+def apply_facet_command(facets: Facets, text: str) -> Tuple[Facets, str]:
+    """
+    The facets after one command, and a note for the user ("" if none).
+
+    Commands compose, each one changing only what it names, except that a
+    price bound the other one contradicts (e.g. "filter over 2000" while
+    under 1000 is set) replaces it instead of leaving an empty range.
+    """
+    if text in _CLEAR:
+        return Facets(), ""
+    if match := _SORT.fullmatch(text):
+        field, direction = match.groups()
+        if field != "price":
+            return facets.model_copy(update={"sort": ""}), ""
+        descending = direction in ("desc", "descending", "high")
+        return facets.model_copy(update={"sort": "price_desc" if descending else "price_asc"}), ""
+    if match := _UNDER.fullmatch(text):
+        high = float(match.group(1))
+        if facets.price_min is not None and facets.price_min > high:
+            return (facets.model_copy(update={"price_min": None, "price_max": high}),
+                    f"No price is both over ${facets.price_min:g} and under ${high:g}, "
+                    f"so the filter is now under ${high:g} only.")
+        return facets.model_copy(update={"price_max": high}), ""
+    if match := _OVER.fullmatch(text):
+        low = float(match.group(1))
+        if facets.price_max is not None and facets.price_max < low:
+            return (facets.model_copy(update={"price_min": low, "price_max": None}),
+                    f"No price is both under ${facets.price_max:g} and over ${low:g}, "
+                    f"so the filter is now over ${low:g} only.")
+        return facets.model_copy(update={"price_min": low}), ""
+    if match := _BETWEEN.fullmatch(text):
+        low, high = sorted(float(amount) for amount in match.groups())
+        return facets.model_copy(update={"price_min": low, "price_max": high}), ""
+    if match := _CATEGORY.fullmatch(text):
+        return facets.model_copy(update={"category": match.group(1).strip()}), ""
+    raise ValueError(f"I didn't understand '{text}'. {FACET_HELP}")
+
+
+def _price(product: Dict[str, Any]) -> Optional[float]:
+    try:
+        return float(product.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+class FacetIndex:
+    """
+    Price and category indexes over one result set.
+
+    Built once per result set: positions sorted by price (both directions,
+    ties in result order) for bisecting price ranges and walking sort orders,
+    and positions per category. select() then answers any combination of
+    facets with a couple of bisections and set intersections.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        products = list(products)
+        self.ids: List[str] = [product["id"] for product in products]
+        priced = sorted((price, position) for position, price in enumerate(map(_price, products))
+                        if price is not None)
+        self._price_keys = [price for price, _ in priced]
+        self._by_price = [position for _, position in priced]
+        self._by_price_desc = [position for _, position in sorted(priced, key=lambda entry: (-entry[0], entry[1]))]
+        # Products without a usable price sort last and never pass a price filter
+        priced_positions = set(self._by_price)
+        self._unpriced = [position for position in range(len(products)) if position not in priced_positions]
+        self._by_category: Dict[str, List[int]] = {}
+        for position, product in enumerate(products):
+            category = str(product.get("category", "")).strip().lower()
+            self._by_category.setdefault(category, []).append(position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _price_range(self, low: Optional[float], high: Optional[float]) -> set:
+        start = bisect_left(self._price_keys, low) if low is not None else 0
+        end = bisect_right(self._price_keys, high) if high is not None else len(self._price_keys)
+        return set(self._by_price[start:end])
+
+    def _category(self, text: str) -> set:
+        # Same rule as the catalog's by_category: the category contains the text
+        text = text.lower()
+        return {position for category, positions in self._by_category.items() if text in category
+                for position in positions}
+
+    def select(self, facets: Facets) -> List[str]:
+        """IDs of the results that pass every filter, in the requested order (bounds are inclusive)."""
+        keep: Optional[set] = None
+        if facets.price_min is not None or facets.price_max is not None:
+            keep = self._price_range(facets.price_min, facets.price_max)
+        if facets.category:
+            category = self._category(facets.category)
+            keep = category if keep is None else keep & category
+
+        if facets.sort == "price_asc":
+            order = self._by_price + self._unpriced
+        elif facets.sort == "price_desc":
+            order = self._by_price_desc + self._unpriced
+        elif keep is not None:
+            order = sorted(keep)
+        else:
+            order = range(len(self.ids))
+        return [self.ids[position] for position in order if keep is None or position in keep]
@@ -0,0 +1,215 @@
+import asyncio, contextvars, functools, json, logging, os, time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of recent samples kept per metric
+WINDOW = 1000
+
+# Stage spans (span()/timed()) cost a timer and a deque append each; set to
+# false to turn them into no-ops. Per-turn traces are logged at DEBUG level.
+TRACE_ENABLED = os.getenv("SHOPPING_TRACE", "true").lower() == "true"
+
+
+def percentile(ordered, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty sequence."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LatencyMetrics:
+    """Rolling latency samples (in seconds) per named stage."""
+
+    def __init__(self, window: int = WINDOW):
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._sizes: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, name: str, seconds: float):
+        self._samples[name].append(seconds)
+
+    def add(self, name: str, amount: float = 1):
+        """Add to a running total, e.g. tokens used."""
+        self._counters[name] += amount
+
+    def counters(self) -> Dict[str, float]:
+        return dict(self._counters)
+
+    def observe(self, name: str, value: float):
+        """Record a sample that is not a duration, e.g. a payload size in bytes."""
+        self._sizes[name].append(value)
+
+    def sizes(self) -> Dict[str, Dict[str, float]]:
+        """Count, p50, p95 and max of every observed size."""
+        report = {}
+        for name, samples in list(self._sizes.items()):
+            ordered = sorted(samples)
+            if ordered:
+                report[name] = {
+                    "count": len(ordered),
+                    "p50": percentile(ordered, 0.5),
+                    "p95": percentile(ordered, 0.95),
+                    "max": ordered[-1],
+                }
+        return report
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a level, e.g. a queue depth."""
+        self._gauges[name] = value
+
+    def gauges(self) -> Dict[str, float]:
+        return dict(self._gauges)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, p50, p95, p99 and max in milliseconds for every recorded stage."""
+        report = {}
+        for name, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            report[name] = {
+                "count": len(ordered),
+                "p50_ms": percentile(ordered, 0.5) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return report
+
+
+metrics = LatencyMetrics()
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """
+    Record how late the event loop wakes up from a short sleep.
+
+    A blocked loop shows up here as lag, which is what every other connected
+    session experiences while it lasts.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        metrics.record("event_loop_lag", time.perf_counter() - start - interval)
+
+
+class TurnTrace:
+    """The stage spans and token counts of one user turn."""
+    __slots__ = ("started", "spans", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (stage, offset from turn start, duration), in seconds
+        self.spans: List[Tuple[str, float, float]] = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def report(self) -> dict:
+        return {
+            "spans": [
+                {"name": name, "start_ms": round(offset * 1000, 2), "ms": round(seconds * 1000, 2)}
+                for name, offset, seconds in self.spans
+            ],
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+# The turn being handled; crew worker threads see it through their copied context
+current_turn: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("current_turn", default=None)
+
+_NO_SPAN = nullcontext()
+
+
+@contextmanager
+def _span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.record(name, elapsed)
+        trace = current_turn.get()
+        if trace is not None:
+            trace.spans.append((name, start - trace.started, elapsed))
+
+
+def span(name: str):
+    """Time a block as a named stage of the current turn."""
+    return _span(name) if TRACE_ENABLED else _NO_SPAN
+
+
+def timed(name: str):
+    """Decorator form of span(); functions are left untouched when tracing is off."""
+    def decorate(func):
+        if not TRACE_ENABLED:
+            return func
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def turn():
+    """Collect the spans of one user turn, and log them as one record when it ends."""
+    trace = TurnTrace()
+    token = current_turn.set(trace)
+    try:
+        yield trace
+    finally:
+        current_turn.reset(token)
+        metrics.record("turn", time.perf_counter() - trace.started)
+        metrics.add("turns")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("turn %s", json.dumps(trace.report()))
+
+
+def count_tokens(name: str, prompt_tokens: int, completion_tokens: int):
+    """Add LLM token usage to the running totals and to the current turn."""
+    metrics.add(f"tokens.{name}", prompt_tokens + completion_tokens)
+    metrics.add(f"tokens.{name}.prompt", prompt_tokens)
+    metrics.add(f"tokens.{name}.completion", completion_tokens)
+    trace = current_turn.get()
+    if trace is not None:
+        trace.prompt_tokens += prompt_tokens
+        trace.completion_tokens += completion_tokens
+
+
+_task_clock: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("task_clock", default=None)
+
+
+def record_task(task_output):
+    """
+    Crew task callback: time each task of a sequential run.
+
+    crewai only reports when a task ends, so a task is timed from the end of
+    the previous one (or from the kickoff, see start_task_clock).
+    """
+    if not TRACE_ENABLED:
+        return
+    started = _task_clock.get()
+    now = time.perf_counter()
+    if started is not None:
+        name = f"task.{getattr(task_output, 'name', None) or task_output.agent}"
+        metrics.record(name, now - started)
+        trace = current_turn.get()
+        if trace is not None:
+            trace.spans.append((name, started - trace.started, now - started))
+    _task_clock.set(now)
+
+
+def start_task_clock():
+    """Mark the start of a crew kickoff, for record_task to time its first task."""
+    _task_clock.set(time.perf_counter())
@@ -0,0 +1,67 @@
+import os, time
+from crewai_flow.crews.shopping_crew.crew_pool import CrewPool, build_shopping_crew, build_search_crew
+from crewai_flow.crew_metrics import metrics, span, count_tokens, start_task_clock
+from crewai_flow.crew_extract import extract_search_results, extract_commentary
+
+# How a crew search runs:
+#   full        - search, recommendation and interaction tasks in sequence
+#   single      - only the tool-calling search task
+#   early_stop  - the search task first; the full crew only if it gave no valid results
+PIPELINE_MODES = ("full", "single", "early_stop")
+PIPELINE_MODE = os.getenv("SHOPPING_PIPELINE_MODE", "full")
+if PIPELINE_MODE not in PIPELINE_MODES:
+    raise ValueError(f"SHOPPING_PIPELINE_MODE must be one of {PIPELINE_MODES}, got '{PIPELINE_MODE}'")
+
+# One prebuilt crew per search worker
+CREW_POOL_SIZE = int(os.getenv("SEARCH_WORKERS", "8"))
+crew_pools = {
+    "full": CrewPool(size=CREW_POOL_SIZE, factory=build_shopping_crew),
+    "single": CrewPool(size=CREW_POOL_SIZE, factory=build_search_crew),
+}
+
+
+def warm_pipeline(mode: str = PIPELINE_MODE):
+    """Prebuild the crews the given mode will use."""
+    for name in (("single", "full") if mode == "early_stop" else (mode,)):
+        crew_pools[name].warm()
+
+
+def kickoff(crew_name: str, query: str, mode: str):
+    start = time.perf_counter()
+    with crew_pools[crew_name].acquire() as crew:
+        start_task_clock()
+        crew_output = crew.kickoff(
+            inputs={
+                "query": query
+            }
+        )
+    metrics.record(f"crew.{crew_name}", time.perf_counter() - start)
+    usage = crew_output.token_usage
+    if usage:
+        # Per mode as well as crew: early_stop's runs of the full crew are not the full mode's
+        count_tokens(f"{mode}.{crew_name}", usage.prompt_tokens, usage.completion_tokens)
+    return crew_output
+
+
+def run_search_pipeline(query: str, mode: str = PIPELINE_MODE):
+    """Run a crew search in the given mode and return the parsed payload (or None)."""
+    start = time.perf_counter()
+    if mode == "early_stop":
+        crew_output = kickoff("single", query, mode)
+        with span("extract"):
+            desired_output = extract_search_results(crew_output)
+        if not desired_output:
+            crew_output = kickoff("full", query, mode)
+            with span("extract"):
+                desired_output = extract_search_results(crew_output)
+    else:
+        crew_output = kickoff(mode, query, mode)
+        with span("extract"):
+            desired_output = extract_search_results(crew_output)
+    metrics.record(f"pipeline.{mode}", time.perf_counter() - start)
+
+    with span("extract"):
+        commentary = extract_commentary(crew_output)
+    if desired_output and commentary:
+        desired_output = {**desired_output, "commentary": commentary}
+    return desired_output
@@ -0,0 +1,73 @@
+import os, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a search query.
+
+    Lower-cased with whitespace collapsed, and with the trailing 's' folded the
+    same way SearchTool builds its singular/plural variations, so "Sofas" and
+    "sofa" share an entry.
+    """
+    query = " ".join(query.lower().split())
+    return query[:-1] if query.endswith('s') else query
+
+
+class QueryCache:
+    """
+    LRU cache of parsed search payloads with a TTL.
+
+    Each entry remembers the catalog snapshot version it was computed from and
+    is discarded once the catalog has been refreshed.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (payload, version, stored_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query: str, catalog_version: int) -> Optional[Dict[str, Any]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, version, stored_at = entry
+                if version == catalog_version and time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return payload
+                del self._entries[key]
+                self.stats["invalidations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, payload: Dict[str, Any], catalog_version: int):
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (payload, catalog_version, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+query_cache = QueryCache()
@@ -0,0 +1,118 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Scores for the ways a typed name can match a product name (exact matches win outright)
+PREFIX = 80
+ALL_TOKENS = 60
+SOME_TOKENS = 40
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(_TOKEN.findall(str(name).lower()))
+
+
+def name_tokens(name: str) -> List[str]:
+    """Lower-cased words with a trailing plural 's' folded, so 'chairs' finds 'chair'."""
+    return [token[:-1] if len(token) > 3 and token.endswith("s") else token
+            for token in _TOKEN.findall(str(name).lower())]
+
+
+class Resolution(NamedTuple):
+    """
+    The best match, or None with candidates to suggest: the tied products
+    when the name is ambiguous, or the closest ones when only some of the
+    typed words matched.
+    """
+    match: Optional[str]
+    candidates: List[str]
+
+    @property
+    def ambiguous(self) -> bool:
+        return self.match is None and bool(self.candidates)
+
+
+class NameResolver:
+    """
+    Resolves what a user typed ("add oak chair") to one product ID.
+
+    Names are kept sorted for prefix lookups by bisection and indexed by word,
+    so resolving only touches the products sharing a prefix or a word with the
+    text. Candidates are ranked exact > prefix > all words > some words; a tie
+    at the top is reported as ambiguous rather than silently picking one, and
+    a match on only some of the words is never picked, just suggested.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        self.rebuild(entries)
+
+    def rebuild(self, entries: Iterable[Tuple[str, str]]):
+        """Index (product_id, name) pairs, replacing whatever was indexed before."""
+        self._names: Dict[str, str] = {}
+        self._exact: Dict[str, List[str]] = defaultdict(list)
+        self._token_counts: Dict[str, int] = {}
+        self._by_token: Dict[str, set] = defaultdict(set)
+        for product_id, name in entries:
+            if product_id in self._names:
+                continue
+            normalized = normalize_name(name)
+            self._names[product_id] = normalized
+            self._exact[normalized].append(product_id)
+            tokens = set(name_tokens(name))
+            self._token_counts[product_id] = len(tokens)
+            for token in tokens:
+                self._by_token[token].add(product_id)
+        self._sorted = sorted((normalized, product_id) for product_id, normalized in self._names.items())
+
+    def __len__(self):
+        return len(self._names)
+
+    def _prefixed(self, text: str) -> List[str]:
+        matches = []
+        position = bisect_left(self._sorted, (text, ""))
+        while position < len(self._sorted) and self._sorted[position][0].startswith(text):
+            matches.append(self._sorted[position][1])
+            position += 1
+        return matches
+
+    def resolve(self, text: str) -> Resolution:
+        normalized = normalize_name(text)
+        if not normalized:
+            return Resolution(None, [])
+
+        exact = self._exact.get(normalized)
+        if exact:
+            return Resolution(exact[0], []) if len(exact) == 1 else Resolution(None, list(exact))
+
+        scores: Dict[str, float] = {}
+        for product_id in self._prefixed(normalized):
+            scores[product_id] = PREFIX
+
+        tokens = set(name_tokens(text))
+        hits: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            for product_id in self._by_token.get(token, ()):
+                hits[product_id] += 1
+        for product_id, count in hits.items():
+            if product_id in scores:
+                continue
+            if count == len(tokens):
+                # Every typed word is in the name
+                score = ALL_TOKENS
+            else:
+                score = SOME_TOKENS * count / len(tokens)
+                if count == self._token_counts[product_id]:
+                    # The whole product name was typed, amid other words
+                    score += 10
+            scores[product_id] = score
+
+        if not scores:
+            return Resolution(None, [])
+        best = max(scores.values())
+        top = [product_id for product_id, score in scores.items() if score == best]
+        if len(top) == 1 and best >= ALL_TOKENS:
+            return Resolution(top[0], [])
+        return Resolution(None, sorted(top, key=self._names.get))
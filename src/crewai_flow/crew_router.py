@@ -0,0 +1,96 @@
+import os, re, threading
+from typing import List
+
+# Queries longer than this are treated as free-form and sent to the crew.
+SIMPLE_QUERY_MAX_WORDS = int(os.getenv("SIMPLE_QUERY_MAX_WORDS", "3"))
+
+CATALOG = "catalog"
+CREW = "crew"
+
+_WORD = re.compile(r"^[a-z][a-z'-]*$")
+
+# Separators between the products of a compound query: "sofa and coffee table, floor lamp"
+_COMPOUND_SEPARATOR = re.compile(r"\s*(?:,|;|&|\+|\band\b|\bplus\b)\s*")
+_LEADING_ARTICLE = re.compile(r"^(?:a|an|the|some)\s+")
+
+# Words that signal constraints, preferences or conversation rather than a product name
+_FREE_FORM_WORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "our", "you", "your",
+    "for", "with", "without", "under", "over", "below", "above", "between", "than",
+    "less", "more", "cheap", "cheaper", "cheapest", "best", "good", "nice", "similar",
+    "like", "need", "want", "looking", "show", "find", "recommend", "suggest",
+    "what", "which", "who", "how", "why", "where", "something", "anything",
+    "and", "or", "but", "not", "that", "this", "please",
+}
+
+
+def route_query(query: str) -> str:
+    """
+    Decide whether a search can be answered straight from the catalog.
+
+    Plain keyword queries such as "chairs" or "dining table" go to the catalog;
+    anything with numbers, punctuation, constraint words or more than a few words
+    goes to the LLM crew.
+    """
+    words = query.lower().split()
+    if not words or len(words) > SIMPLE_QUERY_MAX_WORDS:
+        return CREW
+    for word in words:
+        if not _WORD.match(word) or word in _FREE_FORM_WORDS:
+            return CREW
+    return CATALOG
+
+
+def split_compound_query(query: str) -> List[str]:
+    """
+    Split a compound query into one sub-query per product.
+
+    Only splits when every part is a plain keyword query, so conversational
+    requests that happen to contain "and" stay whole for the crew. Returns
+    [query] when there is nothing to split. A product whose name contains a
+    separator ("table and chairs set") splits here too; the caller checks the
+    whole query against the catalog before searching the parts.
+    """
+    parts = [_LEADING_ARTICLE.sub("", part.strip()) for part in _COMPOUND_SEPARATOR.split(query.lower())]
+    parts = list(dict.fromkeys(part for part in parts if part))
+    if len(parts) < 2 or any(route_query(part) != CATALOG for part in parts):
+        return [query]
+    return parts
+
+
+class RouterStats:
+    """Counts routing decisions and the crew latency avoided by the catalog path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {CATALOG: 0, CREW: 0}
+        # Catalog-routed queries that found nothing and were retried on the crew
+        self.fallbacks = 0
+        self.latency_saved = 0.0
+        self._crew_total = 0.0
+        self._crew_count = 0
+
+    def record(self, route: str, seconds: float):
+        with self._lock:
+            self.routes[route] += 1
+            if route == CREW:
+                self._crew_total += seconds
+                self._crew_count += 1
+            elif self._crew_count:
+                # Estimate against the average crew run seen so far
+                self.latency_saved += max(0.0, self._crew_total / self._crew_count - seconds)
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def summary(self):
+        with self._lock:
+            return {
+                "routes": dict(self.routes),
+                "fallbacks": self.fallbacks,
+                "latency_saved_s": round(self.latency_saved, 3),
+            }
+
+
+router_stats = RouterStats()
@@ -0,0 +1,144 @@
+import atexit, logging, os, sqlite3, threading, time
+from typing import Dict, Optional
+from crewai_flow.crew_state import ShoppingState
+from crewai_flow.crew_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+# Where shopping sessions are persisted; set to an empty string to keep them in memory only
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(PROJECT_ROOT, "sessions.db"))
+# How often pending session writes are flushed, and how many may queue before an early flush
+SESSION_FLUSH_SECONDS = float(os.getenv("SESSION_FLUSH_SECONDS", "1.0"))
+SESSION_FLUSH_BATCH = int(os.getenv("SESSION_FLUSH_BATCH", "500"))
+
+
+class SessionStore:
+    """
+    ShoppingState persisted to SQLite, written behind the conversation.
+
+    save() only queues the session's latest state, replacing any write still
+    pending for it; a background thread writes everything queued in one
+    transaction every flush interval. A turn therefore never waits on disk,
+    and a session changed several times between flushes is written once.
+    The database runs in WAL mode so several app processes can share it.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            key TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, flush_interval: float = SESSION_FLUSH_SECONDS,
+                 flush_batch: int = SESSION_FLUSH_BATCH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()        # guards _pending
+        self._db_lock = threading.Lock()     # serializes use of the connection
+        self._wake = threading.Event()
+        self._stopped = False
+        self._flusher: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self.SCHEMA)
+        self._conn.commit()
+        self.stats = {"saves": 0, "flushes": 0, "rows_written": 0, "loads": 0, "load_hits": 0}
+
+    def load(self, key: str) -> Optional[ShoppingState]:
+        """The saved state for key, or None for a new session."""
+        self.stats["loads"] += 1
+        with self._lock:
+            data = self._pending.get(key)
+        if data is None:
+            with self._db_lock:
+                row = self._conn.execute("SELECT state FROM sessions WHERE key = ?", (key,)).fetchone()
+            data = row[0] if row else None
+        if data is None:
+            return None
+        try:
+            state = ShoppingState.model_validate_json(data)
+        except ValueError as e:
+            logger.warning("Discarding unreadable saved session %s: %s", key, e)
+            return None
+        self.stats["load_hits"] += 1
+        return state
+
+    def save(self, key: str, state: ShoppingState):
+        """Queue the state to be written on the next flush."""
+        # Serialized now, on the caller's thread, so the flush never reads a state being changed
+        data = state.model_dump_json()
+        with self._lock:
+            self._pending[key] = data
+            depth = len(self._pending)
+        self.stats["saves"] += 1
+        metrics.set_gauge("session_store.queue_depth", depth)
+        if self._flusher is None:
+            self._start()
+        if depth >= self.flush_batch:
+            self._wake.set()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+        with self._db_lock:
+            self._conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def flush(self):
+        """Write every queued state now."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        metrics.set_gauge("session_store.queue_depth", 0)
+        if not pending:
+            return
+        start = time.perf_counter()
+        now = time.time()
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO sessions (key, state, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                        [(key, data, now) for key, data in pending.items()],
+                    )
+        except sqlite3.Error as e:
+            # Put the writes back, unless a newer state was queued meanwhile
+            with self._lock:
+                for key, data in pending.items():
+                    self._pending.setdefault(key, data)
+            logger.error("SessionStore: flush of %d sessions failed: %s", len(pending), e)
+            return
+        metrics.record("session_store.flush", time.perf_counter() - start)
+        metrics.add("session_store.rows_written", len(pending))
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(pending)
+
+    def _start(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name="session-flush", daemon=True)
+        self._flusher.start()
+        # Whatever is still queued at shutdown is written before exiting
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+
+# The store every session in this process is saved to (None when persistence is off)
+session_store = SessionStore(SESSION_DB_PATH) if SESSION_DB_PATH else None
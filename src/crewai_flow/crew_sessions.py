@@ -0,0 +1,151 @@
+import asyncio, os, sys, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Upper bound on live sessions per process and how long an idle one is kept.
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "5000"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate number of bytes reachable from obj, counting shared objects once."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+class SessionRegistry:
+    """
+    One ShoppingFlow per Chainlit session.
+
+    Sessions are kept in least-recently-used order; the oldest are evicted when
+    there are more than max_sessions, and any not seen for idle_seconds are
+    dropped on the next access. With a store, a session not in memory (new
+    process, evicted, or a reconnect) starts from its saved state, and
+    persist() queues its state to be saved; an evicted session is saved as it
+    leaves memory.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_sessions: int = MAX_SESSIONS,
+                 idle_seconds: float = SESSION_IDLE_SECONDS, store=None):
+        self.factory = factory
+        self.store = store
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()  # id -> [flow, last_seen]
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "evicted_lru": 0, "evicted_idle": 0}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str):
+        return session_id in self._sessions
+
+    def get(self, session_id: str):
+        """Return the session's flow, creating it on first use."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            flow = self._touch(session_id, now)
+            if flow is None:
+                flow = self._add(session_id, self._create(session_id), now)
+            return flow
+
+    async def get_async(self, session_id: str):
+        """
+        get() for the event loop: a session not in memory is loaded from the
+        store and restored in a worker thread, without holding the lock, so
+        other sessions' turns are not held up by SQLite or a catalog load.
+        """
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            flow = self._touch(session_id, time.monotonic())
+        if flow is not None:
+            return flow
+        created = await asyncio.to_thread(self._create, session_id)
+        with self._lock:
+            # Another message of the same session may have got there first
+            flow = self._touch(session_id, time.monotonic())
+            return flow if flow is not None else self._add(session_id, created, time.monotonic())
+
+    def _touch(self, session_id: str, now: float):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        entry[1] = now
+        self._sessions.move_to_end(session_id)
+        return entry[0]
+
+    def _add(self, session_id: str, flow, now: float):
+        self._sessions[session_id] = [flow, now]
+        self.stats["created"] += 1
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, (evicted, _) = self._sessions.popitem(last=False)
+            self._save(evicted_id, evicted)
+            self.stats["evicted_lru"] += 1
+        return flow
+
+    def _create(self, session_id: str):
+        flow = self.factory()
+        if self.store is not None:
+            saved = self.store.load(session_id)
+            if saved is not None:
+                flow.restore(saved)
+        return flow
+
+    def _save(self, session_id: str, flow):
+        if self.store is not None:
+            self.store.save(session_id, flow.state)
+
+    def persist(self, session_id: str, flow=None):
+        """
+        Queue the session's current state for saving (a no-op without a store).
+
+        Pass the flow a turn ran on to save it even if the session was evicted
+        while the turn was running.
+        """
+        if self.store is None:
+            return
+        if flow is None:
+            with self._lock:
+                entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            flow = entry[0]
+        self._save(session_id, flow)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self, now: float):
+        # Oldest entries come first, so stop at the first one still active
+        while self._sessions:
+            session_id, (flow, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.idle_seconds:
+                break
+            del self._sessions[session_id]
+            self._save(session_id, flow)
+            self.stats["evicted_idle"] += 1
+
+    def memory_report(self) -> Dict[str, int]:
+        """Approximate bytes held by each session's state."""
+        with self._lock:
+            flows = [(session_id, entry[0]) for session_id, entry in self._sessions.items()]
+        return {session_id: deep_sizeof(flow.state) for session_id, flow in flows}
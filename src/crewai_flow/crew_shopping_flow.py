@@ -1,57 +1,225 @@
-import chainlit as cl, json, stripe
-from crewai_flow.crew_state import ShoppingState, CartItem
-from crewai_flow.crew_checkout import create_checkout_session
-from crewai_flow.crews.shopping_crew.shopping_crew import ShoppingCrew
-from crewai_flow.crew_display import display_search_results, display_cart
+import chainlit as cl, asyncio, contextvars, logging, os, time
+from concurrent.futures import ThreadPoolExecutor
+from crewai_flow.crew_state import ShoppingState, Facets
+from crewai_flow.crew_checkout import create_checkout_session, checkout_service, CHECKOUT_MODE
+from crewai_flow.crew_display import display_search_results, display_products, display_cart, display_more, send_page
+from crewai_flow.crew_metrics import metrics, timed, turn
+from crewai_flow.crew_router import route_query, split_compound_query, router_stats, CATALOG, CREW
+from crewai_flow.crew_query_cache import query_cache
+from crewai_flow.crew_resolver import NameResolver
+from crewai_flow.crew_facets import FacetIndex, apply_facet_command, is_facet_command
+from crewai_flow.tools.catalog_search import search_catalog, search_listener
+from crewai_flow.tools.catalog_backends import catalog
+
+logger = logging.getLogger(__name__)
+
+# Crew runs and catalog searches are blocking (LLM and Sheets I/O), so they run
+# on a bounded pool of threads instead of the Chainlit event loop shared by
+# every session.
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="crew-search")
+
+# Show matched products as soon as the search tool returns, before the rest of the crew finishes
+STREAM_RESULTS = os.getenv("SHOPPING_STREAM_RESULTS", "true").lower() == "true"
+
 
 class ShoppingFlow:
     def __init__(self):
         self.state = ShoppingState()
+        # Per-turn bookkeeping, not part of the shopping state
+        self.turn_started = time.perf_counter()
+        self.products_shown = False
+        # IDs of the products the search tool streamed this turn, if it did
+        self.streamed_ids = None
+        self.commentary = None
+        self.pending_streams = []
+        # Resolves "add <name>" against the products the user has been shown
+        self.result_resolver = NameResolver()
+        # Price and category indexes over the current results, built on the first sort/filter
+        self.facet_index = None
     
+    def restore(self, state):
+        """Continue from a saved ShoppingState, e.g. after a reconnect."""
+        self.state = state
+        self.facet_index = None
+        self.result_resolver.rebuild((p["id"], p.get("name", "")) for p in self.available_products())
+
+    async def run_search(self):
+        """Search for the current query and show the results."""
+        self.products_shown = False
+        self.streamed_ids = None
+        self.pending_streams = []
+        await self.search_products()
+        # Let any streamed product message finish before the rest is sent
+        for future in self.pending_streams:
+            await asyncio.wrap_future(future)
+        if not self.products_shown and self.state.search_result_ids:
+            metrics.record("time_to_first_product", time.perf_counter() - self.turn_started)
+        await display_search_results(self.state, products_shown=self.products_shown, commentary=self.commentary)
+
+    async def show_more(self, payload):
+        """Send the next page of a list the user asked to see more of."""
+        await display_more(self.state, payload)
+
+    async def stream_products(self, ids):
+        if self.products_shown:
+            return
+        self.products_shown = True
+        metrics.record("time_to_first_product", time.perf_counter() - self.turn_started)
+        await display_products(ids, query=self.state.user_query)
+
+    @timed("flow.search_products")
     async def search_products(self):
-        print(f"DEBUG: Searching for products matching '{self.state.user_query}'...")
-        # Kick off the search using the crew, passing the user's query.
-        crew_output = ShoppingCrew().crew().kickoff(
-            inputs={
-                "query": self.state.user_query
-            }
-        )
-        
-        # Accessing the crew output
-        desired_output = None
+        query = self.state.user_query
+        sub_queries = split_compound_query(query)
+        route = None
+        if len(sub_queries) > 1 and (await self.run_blocking(catalog.match_products, query))[0]:
+            # "table and chairs set" names one product: search it whole, in the catalog
+            sub_queries, route = [query], CATALOG
+        if len(sub_queries) > 1:
+            # "sofa and floor lamp": look each product up side by side, so the
+            # turn takes about as long as the slowest lookup
+            outputs = await asyncio.gather(*(self.search_query(sub_query, stream=False) for sub_query in sub_queries))
+            self.set_grouped_results(sub_queries, outputs)
+        else:
+            self.set_results(await self.search_query(query, route=route))
 
-        for task_output in crew_output.tasks_output:
-            raw_str = task_output.raw
-            json_str = raw_str
-            
-            # Handle potential markdown code blocks
-            if "```" in raw_str:
-                parts = raw_str.split("```")
-                if len(parts) >= 3:
-                    json_str = parts[1]
-                    if json_str.startswith("json\n"):
-                        json_str = json_str[5:]
-                else:
-                    json_str = raw_str.split("```")[0].strip()
-            
+    @staticmethod
+    async def run_blocking(func, *args):
+        """Run a blocking catalog call on the search pool, in a copy of this context so its spans join the turn."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(search_executor, context.run, func, *args)
+
+    async def search_query(self, query, stream=True, route=None):
+        """Search payload for one query: from the query cache, the catalog or the crew (route overrides route_query)."""
+        logger.debug("Searching for products matching '%s'", query)
+        start = time.perf_counter()
+        desired_output = query_cache.get(query, catalog.version)
+        if desired_output is not None:
+            metrics.record("search.cache", time.perf_counter() - start)
+            return desired_output
+
+        route = route or route_query(query)
+
+        if route == CATALOG:
+            # Plain keyword query: answer straight from the catalog, no LLM round trips
             try:
-                parsed = json.loads(json_str)
-                print(f"DEBUG: PARSED {parsed}")
-                if isinstance(parsed, dict) and "products" in parsed:
-                    desired_output = parsed
-                    break
-            except json.JSONDecodeError:
-                continue
+                desired_output = await self.run_blocking(search_catalog, query)
+            except Exception as e:
+                logger.warning("Catalog search failed: %s", e)
+                desired_output = {"products": []}
+            if not desired_output["products"]:
+                # Nothing matched literally; let the crew interpret the query
+                router_stats.record_fallback()
+                desired_output = None
+                route = CREW
+
+        if route == CREW:
+            desired_output = await self.search_with_crew(query, stream=stream)
+
+        elapsed = time.perf_counter() - start
+        router_stats.record(route, elapsed)
+        metrics.record(f"search.{route}", elapsed)
 
         if desired_output:
-            print("Extracted JSON:", json.dumps(desired_output, indent=2))
-            self.state.search_results = desired_output["products"]
-            # Also store recommended products if available
-            self.state.recommended_products = desired_output.get("recommended_products", [])
+            query_cache.put(query, desired_output, catalog.version)
+        else:
+            logger.info("No valid JSON output with 'products' key was found for '%s'", query)
+        return desired_output
+
+    def set_results(self, desired_output):
+        self.commentary = desired_output.get("commentary") if desired_output else None
+        self.state.result_groups = {}
+        self.reset_facets()
+        # Keep only catalog IDs; the rows stay in the shared catalog
+        if self.streamed_ids is not None:
+            # The user saw the streamed list; "Show more", sort and filter continue it
+            self.state.search_result_ids = self.streamed_ids
         else:
-            print("No valid JSON output with 'products' key was found.")
-            self.state.search_results = []
-            self.state.recommended_products = []
+            self.state.search_result_ids = catalog.ids_for(desired_output["products"]) if desired_output else []
+        # Also store recommended products if available
+        self.state.recommended_ids = catalog.ids_for(desired_output.get("recommended_products", [])) if desired_output else []
+        self.result_resolver.rebuild((p["id"], p.get("name", "")) for p in self.available_products())
+
+    def set_grouped_results(self, sub_queries, outputs):
+        """Merge the sub-query payloads, listing each product once, under the first sub-query that found it."""
+        groups, seen, recommended, commentary = {}, set(), [], []
+        for sub_query, desired_output in zip(sub_queries, outputs):
+            ids = []
+            if desired_output:
+                ids = [pid for pid in catalog.ids_for(desired_output["products"]) if pid not in seen]
+                recommended += catalog.ids_for(desired_output.get("recommended_products", []))
+                if desired_output.get("commentary"):
+                    commentary.append(desired_output["commentary"])
+            seen.update(ids)
+            groups[sub_query] = ids
+        self.commentary = "\n\n".join(commentary) or None
+        self.state.result_groups = groups
+        self.reset_facets()
+        self.state.search_result_ids = [pid for ids in groups.values() for pid in ids]
+        self.state.recommended_ids = [pid for pid in dict.fromkeys(recommended) if pid not in seen]
+        self.result_resolver.rebuild((p["id"], p.get("name", "")) for p in self.available_products())
+
+    def reset_facets(self):
+        """New results start unsorted and unfiltered."""
+        self.state.facets = Facets()
+        self.state.view_ids = []
+        self.facet_index = None
+
+    @timed("flow.facets")
+    async def apply_facets(self, command):
+        """Sort or filter the current results locally, e.g. 'sort price asc' or 'filter under 300'."""
+        if not self.state.search_result_ids:
+            await cl.Message(content="There are no results to sort or filter yet. Search for a product first.").send()
+            return
+        try:
+            self.state.facets, note = apply_facet_command(self.state.facets, command)
+        except ValueError as e:
+            await cl.Message(content=str(e)).send()
+            return
+        if note:
+            await cl.Message(content=note).send()
+        if self.facet_index is None:
+            self.facet_index = FacetIndex(catalog.resolve(self.state.result_set_ids))
+        self.state.view_ids = self.facet_index.select(self.state.facets)
+
+        description = self.state.facets.describe()
+        if not self.state.view_ids:
+            await cl.Message(content=f"No results match {description}. Type 'clear filters' to see them all.").send()
+            return
+        await send_page(f"Results ({description}):", self.state.view_ids, "view", resolve=catalog.resolve,
+                        context={"query": self.state.user_query, "facets": description})
+
+    @staticmethod
+    def describe_ambiguity(prod_name, names):
+        options = "\n".join(f"- {name}" for name in names)
+        if len(names) == 1:
+            return f"'{prod_name}' only partly matches:\n{options}\nPlease use the full product name."
+        return f"'{prod_name}' matches several products:\n{options}\nPlease use the full product name."
+
+    def available_products(self):
+        """Current results, recommendations, then earlier results, without duplicates."""
+        return catalog.resolve(self.state.available_ids)
+
+    async def search_with_crew(self, query: str, stream: bool = True):
+        # Kick off the search using the crew, passing the user's query.
+        loop = asyncio.get_running_loop()
+        # The crew runs in a worker thread; give it a copy of this context so the
+        # search tool can find the listener (and Chainlit its session) there.
+        context = contextvars.copy_context()
+        if STREAM_RESULTS and stream:
+            def listener(payload):
+                # Only the first result is streamed (early_stop may search twice)
+                if self.streamed_ids is not None:
+                    return
+                self.streamed_ids = catalog.ids_for(payload["products"])
+                self.pending_streams.append(
+                    asyncio.run_coroutine_threadsafe(self.stream_products(self.streamed_ids), loop)
+                )
+            context.run(search_listener.set, listener)
+        # crewai is only imported once a search needs a crew (or the warm-up loads it)
+        from crewai_flow.crew_pipeline import run_search_pipeline
+        return await loop.run_in_executor(search_executor, context.run, run_search_pipeline, query)
     
     # # FOR PRODUCTTION
     # async def handle_checkout(self):
@@ -94,7 +262,8 @@ class ShoppingFlow:
     #         else:
     #             await cl.Message(content="Sorry, we couldn't create a checkout session. Please try again later.").send()
     
-    # FOR DEVELOPMENT
+    # FOR DEVELOPMENT (CHECKOUT_MODE=stripe creates real Checkout Sessions)
+    @timed("flow.checkout")
     async def handle_checkout(self):
         """Process checkout using a simulated checkout flow"""
         if not self.state.cart:
@@ -106,9 +275,13 @@ class ShoppingFlow:
         success_url = f"{base_url}/checkout/success"
         cancel_url = f"{base_url}/checkout/cancel"
         
+        if CHECKOUT_MODE == "stripe":
+            await self.handle_stripe_checkout(success_url, cancel_url)
+            return
+        
         # Create checkout session
         checkout_url = create_checkout_session(
-            self.state.cart, 
+            list(self.state.cart.lines()), 
             success_url=success_url,
             cancel_url=cancel_url
         )
@@ -117,8 +290,8 @@ class ShoppingFlow:
             # For development, simulate a successful checkout
             self.state.checkout_status = "Completed"
             
-            # Calculate total
-            total = sum(float(item.product.get('price', 0)) * item.quantity for item in self.state.cart)
+            # The cart keeps its total up to date
+            total = self.state.cart.subtotal
             
             # Display checkout confirmation
             message = (
@@ -127,11 +300,8 @@ class ShoppingFlow:
                 "**Order Summary:**\n"
             )
             
-            for item in self.state.cart:
-                product = item.product
-                price = float(product.get('price', 0))
-                quantity = item.quantity
-                message += f"- {product.get('name')}: ${price} × {quantity} = ${price * quantity}\n"
+            for item in self.state.cart.lines():
+                message += f"- {item.name}: ${item.unit_price} × {item.quantity} = ${item.line_total}\n"
             
             message += f"\n**Total: ${total:.2f}**\n\n"
             message += "Your order will be processed and shipped soon."
@@ -139,11 +309,46 @@ class ShoppingFlow:
             await cl.Message(content=message).send()
             
             # Clear the cart
-            self.state.cart = []
+            self.state.cart.clear()
         else:
             await cl.Message(content="Sorry, we couldn't process your checkout. Please try again.").send()
 
+    async def handle_stripe_checkout(self, success_url, cancel_url):
+        # Awaits Stripe on the event loop instead of blocking it for the HTTP call
+        if self.state.checkout_session_id and await checkout_service.session_finished(self.state.checkout_session_id):
+            # The last session is paid or expired; a new one needs a new idempotency key
+            self.state.checkout_attempt += 1
+            self.state.checkout_session_id = ""
+        session = await checkout_service.create_session(
+            list(self.state.cart.lines()),
+            success_url=success_url,
+            cancel_url=cancel_url,
+            owner=self.state.checkout_owner,
+            attempt=self.state.checkout_attempt,
+        )
+        if session:
+            self.state.checkout_session_id = session.id
+            message = (
+                "## Proceed to Checkout\n\n"
+                f"[Click here to complete your purchase]({session.url})\n\n"
+                "This is a test checkout. You can use these test card numbers:\n"
+                "- Success: 4242 4242 4242 4242\n"
+                "- Decline: 4000 0000 0000 0002\n\n"
+                "Use any future expiration date, any 3-digit CVC, and any postal code."
+            )
+            await cl.Message(content=message).send()
+            self.state.checkout_status = "Initiated"
+        elif not checkout_service.api_key:
+            await cl.Message(content="Checkout failed: Stripe API key is not configured. Please set up your Stripe API key.").send()
+        else:
+            await cl.Message(content="Sorry, we couldn't create a checkout session. Please try again later.").send()
+
     async def interaction_agent(self, message):
+        with turn() as trace:
+            self.turn_started = trace.started
+            await self.handle_action(message)
+
+    async def handle_action(self, message):
         user_action = message.content.lower().strip()
         
         if user_action.startswith("refine"):
@@ -155,55 +360,46 @@ class ShoppingFlow:
             refined_query = parts[1].strip()
             self.state.user_query = refined_query
             await cl.Message(content=f"Refining search for '{refined_query}'...").send()
-            await self.search_products()
-            await display_search_results(self.state)
+            await self.run_search()
 
         elif user_action.startswith("add"):
             parts = user_action.split(maxsplit=1)
             if len(parts) < 2:
                 await cl.Message(content="Please specify which product to add.").send()
-                # Show all available products
-                all_products = list(self.state.search_results)
-                if hasattr(self.state, 'recommended_products') and self.state.recommended_products:
-                    all_products.extend(self.state.recommended_products)
-                if hasattr(self.state, 'previous_results') and self.state.previous_results:
-                    all_products.extend([p for p in self.state.previous_results 
-                                        if p not in self.state.search_results])
-                rec_str = "\nAvailable products:\n"
-                for prod in all_products:
-                    rec_str += f"- {prod.get('name', 'N/A')} | Price: ${prod.get('price', 'N/A')}\n"
-                await cl.Message(content=rec_str).send()
+                # Show all available products, a page at a time
+                await send_page("Available products:", self.state.available_ids, "available",
+                                resolve=catalog.resolve, context={"query": self.state.user_query})
             else:
-                prod_name = parts[1].strip().lower()
+                # Several products can be added at once: "add sofa, floor lamp, side table"
+                prod_names = [name.strip() for name in parts[1].split(",") if name.strip()]
                 # Search in current results, recommended products, and previous results
-                all_products = list(self.state.search_results)
-                if hasattr(self.state, 'recommended_products') and self.state.recommended_products:
-                    all_products.extend(self.state.recommended_products)
-                if hasattr(self.state, 'previous_results') and self.state.previous_results:
-                    all_products.extend([p for p in self.state.previous_results 
-                                        if p not in self.state.search_results])
-                matching_item = next(
-                    (p for p in all_products 
-                    if prod_name in p.get("name", "").lower() or 
-                    p.get("name", "").lower() in prod_name),
-                    None
-                )
-                if matching_item:
-                    # Check if the item is already in the cart
-                    existing_item = next(
-                        (item for item in self.state.cart 
-                        if item.product.get("name") == matching_item.get("name")),
-                        None
-                    )
-                    
-                    if existing_item:
-                        # Update quantity if item already exists
-                        existing_item.quantity += 1
-                        await cl.Message(content=f"Added another {matching_item.get('name')} to your cart (Quantity: {existing_item.quantity}).").send()
+                all_products = self.available_products()
+                by_id = {p["id"]: p for p in all_products}
+                matches, missing, ambiguous = [], [], []
+                for prod_name in prod_names:
+                    resolution = self.result_resolver.resolve(prod_name)
+                    if resolution.match in by_id:
+                        matches.append((by_id[resolution.match], 1))
+                    elif resolution.ambiguous:
+                        names = [by_id[pid].get("name") for pid in resolution.candidates if pid in by_id]
+                        ambiguous.append(self.describe_ambiguity(prod_name, names))
                     else:
-                        # Add new item if it doesn't exist
-                        self.state.cart.append(CartItem(product=matching_item))
-                        await cl.Message(content=f"{matching_item.get('name')} has been added to your cart.").send()
+                        missing.append(prod_name)
+                
+                for note in ambiguous:
+                    await cl.Message(content=note).send()
+                
+                if matches:
+                    # Items already in the cart just get their quantity raised
+                    confirmations = []
+                    for item in self.state.cart.add_many(matches):
+                        if item.quantity > 1:
+                            confirmations.append(f"Added another {item.name} to your cart (Quantity: {item.quantity}).")
+                        else:
+                            confirmations.append(f"{item.name} has been added to your cart.")
+                    for prod_name in missing:
+                        confirmations.append(f"Could not find '{prod_name}'.")
+                    await cl.Message(content="\n".join(confirmations)).send()
                     
                     await display_cart(self.state.cart)
                     
@@ -216,17 +412,16 @@ class ShoppingFlow:
                         "or 'checkout' to proceed to checkout."
                     )
                     await cl.Message(content=prompt).send()
-                else:
+                elif not ambiguous:
                     await cl.Message(content="Product not found. Available products:").send()
-                    rec_str = "\n"
                     # Show both search results and recommended products
-                    for prod in self.state.search_results:
-                        rec_str += f"- {prod.get('name', 'N/A')} | Price: ${prod.get('price', 'N/A')}\n"
-                    if self.state.recommended_products:
-                        rec_str += "\nRecommended products:\n"
-                        for prod in self.state.recommended_products:
-                            rec_str += f"- {prod.get('name', 'N/A')} | Price: ${prod.get('price', 'N/A')}\n"
-                    await cl.Message(content=rec_str).send()
+                    context = {"query": self.state.user_query}
+                    if self.state.search_result_ids:
+                        await send_page("Search results:", self.state.search_result_ids, "results",
+                                        resolve=catalog.resolve, context=context)
+                    if self.state.recommended_ids:
+                        await send_page("Recommended products:", self.state.recommended_ids, "recommended",
+                                        resolve=catalog.resolve, context=context)
 
         
         elif user_action == "view cart":
@@ -242,15 +437,22 @@ class ShoppingFlow:
                 await cl.Message(content="Please specify which product to remove.").send()
                 return
             
-            prod_name = parts[1].strip().lower()
-            for i, item in enumerate(self.state.cart):
-                if prod_name in item.product.get("name", "").lower():
-                    removed_item = self.state.cart.pop(i)
-                    await cl.Message(content=f"Removed {removed_item.product.get('name')} from your cart.").send()
-                    await display_cart(self.state.cart)
-                    return
+            # Several products can be removed at once: "remove sofa, floor lamp"
+            prod_names = [name.strip() for name in parts[1].split(",") if name.strip()]
+            removed = []
+            for prod_name in prod_names:
+                resolution = self.state.cart.resolve(prod_name)
+                if resolution.match:
+                    removed.append(self.state.cart.remove(resolution.match))
+                elif resolution.ambiguous:
+                    names = [self.state.cart.get(pid).name for pid in resolution.candidates]
+                    await cl.Message(content=self.describe_ambiguity(prod_name, names)).send()
+                else:
+                    await cl.Message(content=f"Could not find '{prod_name}' in your cart.").send()
             
-            await cl.Message(content=f"Could not find '{prod_name}' in your cart.").send()
+            if removed:
+                await cl.Message(content="\n".join(f"Removed {item.name} from your cart." for item in removed)).send()
+                await display_cart(self.state.cart)
         
         elif user_action.startswith("update"):
     # First, check if we have at least 3 parts (update, product, quantity)
@@ -278,28 +480,27 @@ class ShoppingFlow:
                 return
             
             # Find and update the product
-            found = False
-            for item in self.state.cart:
-                item_name = item.product.get("name", "").lower()
-                # Check if product name contains the search term OR search term contains product name
-                if prod_name in item_name or item_name in prod_name:
-                    item.quantity = quantity
-                    await cl.Message(content=f"Updated {item.product.get('name')} quantity to {quantity}.").send()
-                    await display_cart(self.state.cart)
-                    found = True
-                    break
-            
-            if not found:
+            resolution = self.state.cart.resolve(prod_name)
+            if resolution.match:
+                item = self.state.cart.update(resolution.match, quantity)
+                await cl.Message(content=f"Updated {item.name} quantity to {quantity}.").send()
+                await display_cart(self.state.cart)
+            elif resolution.ambiguous:
+                names = [self.state.cart.get(pid).name for pid in resolution.candidates]
+                await cl.Message(content=self.describe_ambiguity(prod_name, names)).send()
+            else:
                 await cl.Message(content=f"Could not find '{prod_name}' in your cart.").send()
 
         
+        elif is_facet_command(user_action):
+            await self.apply_facets(user_action)
+
         elif user_action == "clear cart":
-            self.state.cart = []
+            self.state.cart.clear()
             await cl.Message(content="Your cart has been cleared.").send()
         
         else:
             # Treat as a search query
             self.state.user_query = user_action
             await cl.Message(content=f"Searching for products matching '{user_action}'...").send()
-            await self.search_products()
-            await display_search_results(self.state)
+            await self.run_search()
@@ -1,14 +1,205 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+import uuid
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from crewai_flow.tools.catalog_backends import catalog
+from crewai_flow.crew_resolver import NameResolver, Resolution
+
+# State keeps catalog IDs only; product rows live once, in the shared catalog,
+# and are looked up when they are displayed.
+
+
+def price_to_cents(price: Any) -> int:
+    try:
+        return round(float(price) * 100)
+    except (TypeError, ValueError):
+        return 0
+
 
 class CartItem(BaseModel):
-    product: Dict[str, Any]
+    product_id: str
+    # Name and price are captured when the item is added, so totals and
+    # lookups never have to go back to the catalog
+    name: str = ""
+    unit_price_cents: int = 0
     quantity: int = 1
 
+    @property
+    def product(self) -> Dict[str, Any]:
+        """The catalog row for this item (empty if it has left the catalog)."""
+        return catalog.get(self.product_id) or {}
+
+    @property
+    def unit_price(self) -> float:
+        return self.unit_price_cents / 100
+
+    @property
+    def line_total(self) -> float:
+        return self.unit_price_cents * self.quantity / 100
+
+
+class Cart(BaseModel):
+    """
+    Cart lines keyed by product ID, in the order they were added.
+
+    Adding, updating and removing a line are dict operations, and the subtotal
+    and item count are adjusted as lines change instead of being re-summed.
+    """
+    items: Dict[str, CartItem] = Field(default_factory=dict)
+    _subtotal_cents: int = PrivateAttr(default=0)
+    _item_count: int = PrivateAttr(default=0)
+    # Name index over the lines, rebuilt on the next lookup after lines come or go
+    _resolver: Optional[NameResolver] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        # Rebuild the derived totals, e.g. after loading a saved cart
+        for item in self.items.values():
+            self._track(item, 1)
+
+    def _track(self, item: CartItem, sign: int):
+        self._subtotal_cents += sign * item.unit_price_cents * item.quantity
+        self._item_count += sign * item.quantity
+        self._resolver = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, product_id: str):
+        return product_id in self.items
+
+    def lines(self) -> Iterable[CartItem]:
+        return self.items.values()
+
+    def get(self, product_id: str) -> Optional[CartItem]:
+        return self.items.get(product_id)
+
+    @property
+    def subtotal(self) -> float:
+        return self._subtotal_cents / 100
+
+    @property
+    def item_count(self) -> int:
+        return self._item_count
+
+    def add(self, product: Dict[str, Any], quantity: int = 1) -> CartItem:
+        """Add a catalog product, or raise the quantity if it is already in the cart."""
+        item = self.items.get(product["id"])
+        if item is not None:
+            return self.update(item.product_id, item.quantity + quantity)
+        item = CartItem(
+            product_id=product["id"],
+            name=str(product.get("name", "")),
+            unit_price_cents=price_to_cents(product.get("price", 0)),
+            quantity=quantity,
+        )
+        self.items[item.product_id] = item
+        self._track(item, 1)
+        return item
+
+    def add_many(self, products: Iterable[Tuple[Dict[str, Any], int]]) -> List[CartItem]:
+        """Add several (product, quantity) pairs in one go."""
+        return [self.add(product, quantity) for product, quantity in products]
+
+    def update(self, product_id: str, quantity: int) -> CartItem:
+        item = self.items[product_id]
+        self._subtotal_cents += (quantity - item.quantity) * item.unit_price_cents
+        self._item_count += quantity - item.quantity
+        item.quantity = quantity
+        return item
+
+    def remove(self, product_id: str) -> CartItem:
+        item = self.items.pop(product_id)
+        self._track(item, -1)
+        return item
+
+    def clear(self):
+        self.items.clear()
+        self._subtotal_cents = 0
+        self._item_count = 0
+        self._resolver = None
+
+    def resolve(self, name: str) -> Resolution:
+        """Match what the user typed against the names of the lines in the cart."""
+        if self._resolver is None:
+            self._resolver = NameResolver((item.product_id, item.name) for item in self.items.values())
+        return self._resolver.resolve(name)
+
+
+class Facets(BaseModel):
+    """Sort order and filters applied to the current results."""
+    sort: str = ""  # "", "price_asc" or "price_desc"
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    category: str = ""
+
+    def describe(self) -> str:
+        parts = []
+        if self.sort:
+            parts.append("price low to high" if self.sort == "price_asc" else "price high to low")
+        if self.price_min is not None and self.price_max is not None:
+            parts.append(f"${self.price_min:g} to ${self.price_max:g}")
+        elif self.price_max is not None:
+            parts.append(f"under ${self.price_max:g}")
+        elif self.price_min is not None:
+            parts.append(f"over ${self.price_min:g}")
+        if self.category:
+            parts.append(f"category '{self.category}'")
+        return ", ".join(parts) or "all results"
+
+
 class ShoppingState(BaseModel):
     user_query: str = ""
-    search_results: List[Dict[str, Any]] = Field(default_factory=list)
-    recommended_products: List[Dict[str, Any]] = Field(default_factory=list)
-    previous_results: List[Dict[str, Any]] = Field(default_factory=list)
-    cart: List[CartItem] = Field(default_factory=list)
+    search_result_ids: List[str] = Field(default_factory=list)
+    recommended_ids: List[str] = Field(default_factory=list)
+    previous_result_ids: List[str] = Field(default_factory=list)
+    # Result IDs per sub-query when a compound query was split; empty otherwise
+    result_groups: Dict[str, List[str]] = Field(default_factory=dict)
+    # Sort/filter commands over the current results, and the IDs they left
+    facets: Facets = Field(default_factory=Facets)
+    view_ids: List[str] = Field(default_factory=list)
+    cart: Cart = Field(default_factory=Cart)
     checkout_status: str = "Not Started"
+    # Scopes checkout idempotency keys to this shopper, across reconnects
+    checkout_owner: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    # The last Stripe session created, and which attempt's idempotency key made it
+    checkout_session_id: str = ""
+    checkout_attempt: int = 0
+
+    @property
+    def search_results(self) -> List[Dict[str, Any]]:
+        return catalog.resolve(self.search_result_ids)
+
+    @property
+    def recommended_products(self) -> List[Dict[str, Any]]:
+        return catalog.resolve(self.recommended_ids)
+
+    @property
+    def previous_results(self) -> List[Dict[str, Any]]:
+        return catalog.resolve(self.previous_result_ids)
+
+    @property
+    def result_set_ids(self) -> List[str]:
+        """Current results then recommendations, without duplicates: what sort and filter apply to."""
+        return list(dict.fromkeys(self.search_result_ids + self.recommended_ids))
+
+    @property
+    def available_ids(self) -> List[str]:
+        """Current results, recommendations, then earlier results, without duplicates."""
+        return list(dict.fromkeys(self.search_result_ids + self.recommended_ids + self.previous_result_ids))
+
+    def section_ids(self, section: str) -> List[str]:
+        """The IDs of a displayed list, by the section name its "Show more" action carries."""
+        if section == "results":
+            return self.search_result_ids
+        if section == "recommended":
+            return self.recommended_ids
+        if section == "available":
+            return self.available_ids
+        if section == "view":
+            return self.view_ids
+        if section.startswith("group:"):
+            return self.result_groups.get(section[len("group:"):], [])
+        return []
+
+    @property
+    def grouped_results(self) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        return [(sub_query, catalog.resolve(ids)) for sub_query, ids in self.result_groups.items()]
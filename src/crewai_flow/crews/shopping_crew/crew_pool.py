@@ -0,0 +1,91 @@
+import queue, threading, time
+from contextlib import contextmanager
+from typing import Callable
+from crewai import Crew
+from crewai.agents.agent_builder.utilities.base_token_process import TokenProcess
+from crewai_flow.crews.shopping_crew.shopping_crew import ShoppingCrew
+from crewai_flow.crew_metrics import metrics
+
+
+def build_shopping_crew() -> Crew:
+    return ShoppingCrew().crew()
+
+
+def build_search_crew() -> Crew:
+    return ShoppingCrew().search_crew()
+
+
+def reset_run_state(crew: Crew):
+    """
+    Clear what a kickoff leaves behind on the crew, its tasks and agents.
+
+    crewAI keeps counters on the Task (used_tools drives the "remember the
+    format" reminder appended to tool observations), outputs, tool results
+    and token counts across kickoffs; a reused crew must start each run as a
+    freshly built one would.
+    """
+    for task in crew.tasks:
+        task.used_tools = task.tools_errors = task.delegations = task.retry_count = 0
+        task.output = None
+        task.processed_by_agents = set()
+        task.start_time = task.end_time = None
+    for agent in crew.agents:
+        agent.tools_results = []
+        agent._times_executed = 0
+        agent._token_process = TokenProcess()
+    crew.usage_metrics = None
+
+
+class CrewPool:
+    """
+    Prebuilt crews, each lent to one request at a time.
+
+    Building a crew re-reads the agent/task YAML and creates every Agent, Task
+    and LLM client, so crews are built once and reused; kickoff interpolates
+    the request's inputs into the task templates afresh on every run, and a
+    crew's per-run state is reset before it goes back into the pool.
+    """
+
+    def __init__(self, size: int, factory: Callable[[], Crew] = build_shopping_crew):
+        self.size = size
+        self.factory = factory
+        self._idle = queue.LifoQueue()  # most recently used first, to keep few crews hot
+        self._lock = threading.Lock()
+        self.stats = {"built": 0, "reused": 0, "discarded": 0}
+
+    def _build(self) -> Crew:
+        start = time.perf_counter()
+        crew = self.factory()
+        metrics.record("crew.build", time.perf_counter() - start)
+        with self._lock:
+            self.stats["built"] += 1
+        return crew
+
+    def warm(self):
+        """Fill the pool up front so the first requests do not pay for construction."""
+        while self._idle.qsize() < self.size:
+            self._idle.put(self._build())
+
+    @contextmanager
+    def acquire(self):
+        start = time.perf_counter()
+        try:
+            crew = self._idle.get_nowait()
+            with self._lock:
+                self.stats["reused"] += 1
+        except queue.Empty:
+            crew = self._build()
+        # Per-request construction cost: near zero once the pool is warm
+        metrics.record("crew.acquire", time.perf_counter() - start)
+
+        try:
+            yield crew
+        except Exception:
+            # A crew that failed mid-run may hold partial task state; don't reuse it
+            with self._lock:
+                self.stats["discarded"] += 1
+            raise
+        else:
+            if self._idle.qsize() < self.size:
+                reset_run_state(crew)
+                self._idle.put(crew)
@@ -1,8 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
 
 class Product(BaseModel):
+    # Keep any extra sheet columns (image_url, ...) the tool passes through
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
     name: str
     price: float
     category: Optional[str] = None
@@ -10,6 +14,5 @@ class Product(BaseModel):
 
 class SearchResults(BaseModel):
     products: List[Product]
+    recommended_products: List[Product] = Field(default_factory=list)
     message: Optional[str] = None
-
-    
\ No newline at end of file
@@ -5,18 +5,27 @@ from crewai_flow.tools.custom_tool import (
    # Other tools as needed...
 )
 from crewai_flow.crews.shopping_crew.models import SearchResults
+from crewai_flow.crew_metrics import record_task
 
 @CrewBase
 class ShoppingCrew:
     """Shopping Crew to assist users from product search to checkout."""
     
     search_tool = SearchTool()
+    # Replaces every agent's configured LLM when set, e.g. with the stub LLM
+    # the offline benchmarks use; None keeps the models from agents.yaml
+    llm = None
 
     @agent
     def search_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["search_agent"],
             tools=[self.search_tool],
+            llm=self.llm,
+            # Pooled crews are reused across turns and sessions: a tool cache
+            # would answer a repeated query from a stale catalog and skip the
+            # streaming of its results
+            cache=False,
             verbose=True,
         )
 
@@ -24,12 +33,14 @@ class ShoppingCrew:
     def recommendation_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["recommendation_agent"],
+            llm=self.llm,
         )
 
     @agent
     def interaction_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["interaction_agent"],
+            llm=self.llm,
             verbose=True
         )
 
@@ -39,7 +50,8 @@ class ShoppingCrew:
             config=self.tasks_config["search_products"],
             agent=self.search_agent(),
             allow_delegation=False,
-            output_type=SearchResults
+            output_pydantic=SearchResults,
+            callback=record_task
         )
 
     @task
@@ -47,14 +59,16 @@ class ShoppingCrew:
         return Task(
             config=self.tasks_config["recommend_products"],
             agent=self.recommendation_agent(),
-            output_type=SearchResults
+            output_pydantic=SearchResults,
+            callback=record_task
         )
 
     @task
     def interaction_task(self) -> Task:
         return Task(
             config=self.tasks_config["interaction_task"],
-            agent=self.interaction_agent()
+            agent=self.interaction_agent(),
+            callback=record_task
         )
 
     @crew
@@ -64,5 +78,16 @@ class ShoppingCrew:
             agents=self.agents,  # Automatically created by the @agent decorator
             tasks=self.tasks,    # Automatically created by the @task decorator
             process=Process.sequential,
+            cache=False,
+            verbose=True,
+        )
+
+    def search_crew(self) -> Crew:
+        """Single-task crew: the search agent's tool output is the whole answer."""
+        return Crew(
+            agents=[self.search_agent()],
+            tasks=[self.search_task()],
+            process=Process.sequential,
+            cache=False,
             verbose=True,
         )
@@ -1,13 +1,97 @@
-import chainlit as cl
+import chainlit as cl, asyncio, logging, os, sys, time
+from chainlit.server import app
 from crewai_flow.crew_shopping_flow import ShoppingFlow
+from crewai_flow.crew_metrics import metrics, monitor_event_loop
+from crewai_flow.crew_router import router_stats
+from crewai_flow.crew_query_cache import query_cache
+from crewai_flow.crew_sessions import SessionRegistry
+from crewai_flow.crew_session_store import session_store
+from crewai_flow.tools.catalog_backends import catalog
 
 
-flow = ShoppingFlow()
+# Every Chainlit conversation gets its own flow (and so its own cart and
+# results). Flows are keyed by thread ID, which survives reconnects, so a
+# returning user's saved state is picked up from the session store.
+sessions = SessionRegistry(ShoppingFlow, store=session_store)
+loop_monitor = None
+
+logger = logging.getLogger(__name__)
+
+# crewai, gspread, stripe and numpy are imported on first use rather than at
+# startup. With the warm-up on, the first chat starts loading the catalog,
+# recommender and crews in the background right after its welcome message.
+WARMUP = os.getenv("SHOPPING_WARMUP", "true").lower() == "true"
+
+
+def warm_up():
+    """Load what the first search would otherwise wait for, off the event loop."""
+    start = time.perf_counter()
+    try:
+        catalog.warm()
+        from crewai_flow.crew_pipeline import warm_pipeline
+        warm_pipeline()
+    except Exception as e:
+        # Not fatal: whatever failed is loaded again on first use
+        logger.warning("Warm-up failed: %s", e)
+    metrics.record("warm_up", time.perf_counter() - start)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Stage latencies, token totals and cache/pool counters, as JSON."""
+    cache = getattr(catalog, "cache", None)
+    # Only reported once something has imported the crew stack
+    pipeline = sys.modules.get("crewai_flow.crew_pipeline")
+    return {
+        "latency": metrics.summary(),
+        "counters": metrics.counters(),
+        "router": router_stats.summary(),
+        "query_cache": {**query_cache.stats, "hit_rate": query_cache.hit_rate},
+        "catalog": {"backend": catalog.name, "version": catalog.version, **(cache.stats if cache else {})},
+        "recommender": catalog.recommender_stats,
+        "crew_pools": {name: pool.stats for name, pool in pipeline.crew_pools.items()} if pipeline else {},
+        "gauges": metrics.gauges(),
+        "sizes": metrics.sizes(),
+        "sessions": {"active": len(sessions), **sessions.stats},
+        "session_store": session_store.stats if session_store else None,
+    }
+
+
+def session_key():
+    return cl.context.session.thread_id
+
 
 @cl.on_message
 async def handle_message(message):
-    await flow.interaction_agent(message)
+    key = session_key()
+    flow = await sessions.get_async(key)
+    try:
+        await flow.interaction_agent(message)
+    finally:
+        # Written behind the conversation; the turn does not wait for it
+        sessions.persist(key, flow)
+
+@cl.action_callback("show_more")
+async def show_more(action):
+    # The next page of a paginated list; each page has its own button
+    flow = await sessions.get_async(session_key())
+    await action.remove()
+    await flow.show_more(action.payload)
 
 @cl.on_chat_start
 async def start():
+    global loop_monitor
+    first_chat = loop_monitor is None
+    if first_chat:
+        # One process-wide sampler of event loop lag
+        loop_monitor = asyncio.create_task(monitor_event_loop())
+    await sessions.get_async(session_key())
     await cl.Message(content="Welcome to our Furniture Shopping Assistant! What type of furniture are you looking for today?").send()
+    if first_chat and WARMUP:
+        # After the welcome, so the imports never hold it up
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+@cl.on_chat_end
+async def end():
+    # Only frees memory; the saved state stays for the next reconnect
+    sessions.drop(session_key())
@@ -0,0 +1,479 @@
+import csv, json, os, sqlite3, threading, time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from crewai_flow.tools.catalog_cache import CatalogCache
+from crewai_flow.tools.catalog_sync import SheetSync
+from crewai_flow.tools.catalog_snapshot import MmapSnapshot
+from crewai_flow.tools.search_index import query_variations, product_id, NGRAM
+
+# Get the project root directory
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+CREDENTIALS_PATH = os.path.join(PROJECT_ROOT, "gc.json")
+SHEET_NAME = "FurnitureProducts"
+
+# Which catalog to serve: sheets (default), csv, parquet, sqlite or mmap; the
+# file based backends read CATALOG_PATH.
+CATALOG_BACKEND = os.getenv("CATALOG_BACKEND", "sheets")
+CATALOG_PATH = os.getenv("CATALOG_PATH", "")
+# How often an mmap worker checks whether the loader has published a new snapshot
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "1.0"))
+
+SearchResult = Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]
+MatchResult = Tuple[List[Dict[str, Any]], List[str]]
+
+
+class CatalogBackend(ABC):
+    """
+    Where the product catalog lives and how it is queried.
+
+    Every backend hands out rows as dicts carrying a stable 'id'. search()
+    keeps SearchTool's semantics: names containing the query or its plural
+    variation, plus the other products in the matched categories.
+    """
+    name = "base"
+    _recommenders = None  # RecommenderCache, created on first use
+    _recommenders_lock = threading.Lock()
+
+    @abstractmethod
+    def load_products(self) -> List[Dict[str, Any]]:
+        """Every row in the catalog."""
+
+    @abstractmethod
+    def search(self, query: str) -> SearchResult:
+        """Return (matching products, same-category recommendations, matched categories)."""
+
+    def match_products(self, query: str) -> MatchResult:
+        """Return (matching products, matched categories): search() without the same-category list."""
+        matching, _, categories = self.search(query)
+        return matching, categories
+
+    @abstractmethod
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        """Products whose category contains the given text, case-insensitively."""
+
+    @abstractmethod
+    def resolve(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Rows for the given IDs, in order, skipping any no longer in the catalog."""
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        found = self.resolve([pid])
+        return found[0] if found else None
+
+    @abstractmethod
+    def ids_for(self, products: Iterable[Dict[str, Any]]) -> List[str]:
+        """Catalog IDs for product dicts (e.g. echoed back by the LLM), by id or exact name."""
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """Changes whenever the data behind the backend changes."""
+
+    def all_products(self) -> List[Dict[str, Any]]:
+        """Every row, from wherever the backend already holds them."""
+        return self.load_products()
+
+    @property
+    def recommenders(self):
+        if self._recommenders is None:
+            # Imported here so numpy loads with the first recommendation, not the app
+            from crewai_flow.tools.recommender import RecommenderCache
+            with self._recommenders_lock:
+                if self._recommenders is None:
+                    self._recommenders = RecommenderCache(self.all_products, lambda: self.version)
+        return self._recommenders
+
+    @property
+    def recommender_stats(self) -> Optional[Dict[str, Any]]:
+        """Build counters, or None until the first recommendation."""
+        return self._recommenders.stats if self._recommenders is not None else None
+
+    def recommend(self, products: Iterable[Dict[str, Any]], k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to k (RECOMMEND_TOP_K by default) other products most similar to the given ones, best first."""
+        return self.resolve(self.recommenders.get().similar((p["id"] for p in products), k))
+
+    def warm(self):
+        """Load what the first search and recommendation would otherwise wait for."""
+        self.recommenders.get()  # loads the catalog first
+
+
+class InMemoryBackend(CatalogBackend):
+    """Loads every row into a shared CatalogCache and answers from its SearchIndex."""
+
+    def __init__(self):
+        self.cache = CatalogCache(loader=self.load_products, sync=self.sync_changes)
+
+    @property
+    def index(self):
+        return self.cache.index
+
+    def all_products(self) -> List[Dict[str, Any]]:
+        return self.cache.get_products()
+
+    def sync_changes(self, index) -> Optional[int]:
+        """Apply source changes to index in place and return the rows updated, or None to reload it all."""
+        return None
+
+    def search(self, query: str) -> SearchResult:
+        return self.cache.snapshot().index.search(query)
+
+    def match_products(self, query: str) -> MatchResult:
+        return self.cache.snapshot().index.match_products(query)
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        return self.index.category_contains(category)
+
+    def resolve(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return self.index.resolve(ids)
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        return self.index.by_id.get(pid)
+
+    def ids_for(self, products: Iterable[Dict[str, Any]]) -> List[str]:
+        return self.index.ids_for(products)
+
+    @property
+    def version(self) -> int:
+        return self.cache.version
+
+
+class SheetsBackend(InMemoryBackend):
+    """
+    The FurnitureProducts Google Sheet, through one reused gspread client.
+
+    Refreshes go through SheetSync, so only rows changed since the last
+    refresh are fetched and re-indexed. Pass a worksheet (e.g. the
+    benchmarks' FakeWorksheet) to run without Google credentials.
+    """
+    name = "sheets"
+
+    def __init__(self, sheet_name: str = SHEET_NAME, credentials_path: str = CREDENTIALS_PATH, worksheet=None):
+        self.sheet_name = sheet_name
+        self.credentials_path = credentials_path
+        self._client = None
+        self._sheet_sync = SheetSync(worksheet) if worksheet is not None else None
+        super().__init__()
+
+    def _get_sync(self) -> SheetSync:
+        if self._sheet_sync is None:
+            if self._client is None:
+                import gspread
+                self._client = gspread.service_account(filename=self.credentials_path)
+            # Ensure your sheet includes 'name' and 'category' columns
+            self._sheet_sync = SheetSync(self._client.open(self.sheet_name).sheet1)
+        return self._sheet_sync
+
+    def _reset(self):
+        # Drop the client so expired credentials are re-read on the next attempt
+        if self._client is not None:
+            self._client = None
+            self._sheet_sync = None
+
+    def load_products(self) -> List[Dict[str, Any]]:
+        try:
+            return self._get_sync().load()
+        except Exception:
+            self._reset()
+            raise
+
+    def sync_changes(self, index) -> Optional[int]:
+        try:
+            return self._get_sync().sync(index)
+        except Exception:
+            self._reset()
+            raise
+
+
+def _coerce_price(row: Dict[str, Any]) -> Dict[str, Any]:
+    # CSV cells are all text; give prices the numeric type the sheet API returns
+    price = row.get("price")
+    if isinstance(price, str) and price.strip():
+        try:
+            row["price"] = float(price) if "." in price else int(price)
+        except ValueError:
+            pass
+    return row
+
+
+class FileBackend(InMemoryBackend):
+    """A CSV or Parquet export of the catalog, loaded into memory."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.format = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+        self.name = self.format
+        super().__init__()
+
+    def load_products(self) -> List[Dict[str, Any]]:
+        if self.format == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Reading a Parquet catalog requires pyarrow (pip install pyarrow)") from e
+            return pq.read_table(self.path).to_pylist()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [_coerce_price(row) for row in csv.DictReader(f)]
+
+
+class SQLiteBackend(CatalogBackend):
+    """
+    A local SQLite catalog with an FTS5 trigram index on product names.
+
+    Category and price are indexed columns; each row's full record is kept as
+    JSON so extra sheet columns survive. Build the file with SQLiteBackend.build().
+    """
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE products (
+            rowid INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price REAL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX products_category ON products(category);
+        CREATE INDEX products_price ON products(price);
+        CREATE INDEX products_name ON products(name COLLATE NOCASE);
+        CREATE VIRTUAL TABLE products_fts USING fts5(
+            name, content='products', content_rowid='rowid', tokenize='trigram'
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @classmethod
+    def build(cls, path: str, products: Iterable[Dict[str, Any]]) -> "SQLiteBackend":
+        """Write the given rows to a new database at path, replacing any existing file."""
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(cls.SCHEMA)
+            seen = set()
+
+            def rows():
+                for position, product in enumerate(products):
+                    pid = product_id(product)
+                    if pid in seen:
+                        # Same rule as SearchIndex, so IDs agree across backends
+                        pid = f"{pid}-{position}"
+                    seen.add(pid)
+                    record = dict(product, id=pid)
+                    price = record.get("price")
+                    yield (
+                        position, pid, str(record.get("name", "")),
+                        str(record.get("category", "")).strip(),
+                        price if isinstance(price, (int, float)) else None,
+                        json.dumps(record),
+                    )
+
+            conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?)", rows())
+            conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+            conn.commit()
+        finally:
+            conn.close()
+        # Readers never see a half-written file
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; searches run on worker threads
+        conn = getattr(self._local, "conn", None)
+        version = self.version
+        if conn is None or self._local.version != version:
+            # First use on this thread, or build() swapped in a new file
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+            self._local.version = version
+        return conn
+
+    def _rows(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        return [json.loads(data) for (data,) in self._conn().execute(sql, params)]
+
+    def load_products(self) -> List[Dict[str, Any]]:
+        return self._rows("SELECT data FROM products ORDER BY rowid")
+
+    def _match_sql(self, query: str) -> Tuple[str, list]:
+        """A SELECT of the rowids whose name contains the query or its plural variation."""
+        parts, params = [], []
+        for variation in query_variations(query):
+            if len(variation) < NGRAM:
+                # The trigram index cannot serve one- and two-letter queries
+                parts.append("SELECT rowid FROM products WHERE instr(lower(name), ?) > 0")
+                params.append(variation)
+            else:
+                parts.append("SELECT rowid FROM products_fts WHERE products_fts MATCH ?")
+                params.append('"' + variation.replace('"', '""') + '"')
+        return " UNION ".join(parts), params
+
+    def match_products(self, query: str) -> MatchResult:
+        match_sql, params = self._match_sql(query)
+        matching = self._rows(
+            f"SELECT data FROM products WHERE rowid IN ({match_sql}) ORDER BY rowid", params)
+        if not matching:
+            return [], []
+        categories = [category for (category,) in self._conn().execute(
+            f"SELECT category FROM products WHERE rowid IN ({match_sql}) AND category != '' "
+            f"GROUP BY category ORDER BY MIN(rowid)", params)]
+        return matching, categories
+
+    def search(self, query: str) -> SearchResult:
+        matching, categories = self.match_products(query)
+        if not categories:
+            return matching, [], []
+
+        match_sql, params = self._match_sql(query)
+        category_marks = ",".join("?" * len(categories))
+        recommended = self._rows(
+            f"SELECT data FROM products WHERE category IN ({category_marks}) "
+            f"AND rowid NOT IN ({match_sql}) ORDER BY rowid",
+            categories + params,
+        )
+        return matching, recommended, categories
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        return self._rows(
+            "SELECT data FROM products WHERE category IN "
+            "(SELECT DISTINCT category FROM products WHERE instr(lower(category), ?) > 0) ORDER BY rowid",
+            (category.lower(),),
+        )
+
+    def resolve(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        ids = list(ids)
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        found = {record["id"]: record for record in self._rows(
+            f"SELECT data FROM products WHERE id IN ({marks})", tuple(ids))}
+        return [found[pid] for pid in ids if pid in found]
+
+    def ids_for(self, products: Iterable[Dict[str, Any]]) -> List[str]:
+        conn = self._conn()
+        ids = []
+        for product in products:
+            row = None
+            if product.get("id") is not None:
+                row = conn.execute("SELECT id FROM products WHERE id = ?", (str(product["id"]),)).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT id FROM products WHERE name = ? COLLATE NOCASE ORDER BY rowid LIMIT 1",
+                    (str(product.get("name", "")),),
+                ).fetchone()
+            if row is not None:
+                ids.append(row[0])
+        return list(dict.fromkeys(ids))
+
+    @property
+    def version(self) -> int:
+        # A rebuilt database replaces the file, changing its modification time
+        return os.stat(self.path).st_mtime_ns
+
+
+class _SnapshotRecommenders:
+    """The RecommenderCache interface over the recommender the loader stored in the snapshot."""
+
+    def __init__(self, backend: "MmapBackend"):
+        self._backend = backend
+
+    def get(self):
+        return self._backend.snapshot().recommender
+
+
+class MmapBackend(CatalogBackend):
+    """
+    A snapshot file written by one loader process and mapped by every worker.
+
+    Workers share the mapped pages instead of each holding a parsed copy, and
+    start without loading anything. When the loader replaces the file, the
+    next lookup after SNAPSHOT_CHECK_SECONDS switches to the new snapshot;
+    lookups already running finish on the old one.
+    """
+    name = "mmap"
+
+    def __init__(self, path: str, check_interval: float = SNAPSHOT_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[MmapSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> MmapSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            self._checked_at = now
+            stat = os.stat(self.path)
+            if self._snapshot is None or self._snapshot.version != (stat.st_ino, stat.st_mtime_ns):
+                # One reference swap; nothing is copied out of the old mapping
+                self._snapshot = MmapSnapshot(self.path)
+            return self._snapshot
+
+    def load_products(self) -> List[Dict[str, Any]]:
+        return self.snapshot().products
+
+    def search(self, query: str) -> SearchResult:
+        return self.snapshot().search(query)
+
+    def match_products(self, query: str) -> MatchResult:
+        return self.snapshot().match_products(query)
+
+    @property
+    def recommenders(self):
+        # The loader stored the vectors in the snapshot; no rows are decoded to rebuild them
+        return _SnapshotRecommenders(self)
+
+    @property
+    def recommender_stats(self) -> Optional[Dict[str, Any]]:
+        """Nothing is built in this process; None until the snapshot's recommender is first used."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot._recommender is None:
+            return None
+        return {"source": "snapshot", "builds": 0, "products": len(snapshot.recommender)}
+
+    def recommend(self, products: Iterable[Dict[str, Any]], k: Optional[int] = None) -> List[Dict[str, Any]]:
+        snapshot = self.snapshot()
+        return snapshot.resolve(snapshot.recommender.similar((p["id"] for p in products), k))
+
+    def warm(self):
+        # Mapping the snapshot is the whole load; the recommender is views of the mapping
+        self.snapshot().recommender
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        return self.snapshot().category_contains(category)
+
+    def resolve(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return self.snapshot().resolve(ids)
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        return self.snapshot().get(pid)
+
+    def ids_for(self, products: Iterable[Dict[str, Any]]) -> List[str]:
+        return self.snapshot().ids_for(products)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version[1]
+
+
+def create_backend(kind: str = CATALOG_BACKEND, path: str = CATALOG_PATH) -> CatalogBackend:
+    if kind == "sheets":
+        return SheetsBackend()
+    if kind in ("csv", "parquet"):
+        return FileBackend(path, kind)
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    if kind == "mmap":
+        return MmapBackend(path)
+    raise ValueError(f"Unknown CATALOG_BACKEND '{kind}'; use sheets, csv, parquet, sqlite or mmap")
+
+
+# The catalog every tool and session in this process reads from
+catalog = create_backend()
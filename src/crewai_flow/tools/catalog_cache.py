@@ -0,0 +1,134 @@
+import logging, os, threading, time
+from typing import Any, Callable, Dict, List, Optional
+from crewai_flow.tools.search_index import SearchIndex
+from crewai_flow.crew_metrics import span
+
+logger = logging.getLogger(__name__)
+
+# How long a catalog snapshot is served before a background refresh is started.
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+
+
+class CatalogSnapshot:
+    """A parsed copy of the product catalog and its search index; delta syncs update it in place."""
+    __slots__ = ("products", "index", "version", "loaded_at")
+
+    def __init__(self, products: List[Dict[str, Any]], version: int):
+        self.products = products
+        # Built here so the cost lands on the (background) refresh, not on a query
+        self.index = SearchIndex(products)
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+
+class CatalogCache:
+    """
+    Process-wide cache of the product catalog.
+
+    Holds one parsed snapshot of whatever the loader returns. The first read
+    loads it synchronously; once the snapshot is older than the TTL it keeps
+    being served while a single background thread refreshes it. With a sync
+    callable the refresh first tries to apply only the changes to the current
+    index, and falls back to a full load when sync returns None.
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]], ttl: float = CATALOG_TTL_SECONDS,
+                 sync: Optional[Callable[[SearchIndex], Optional[int]]] = None):
+        self.ttl = ttl
+        self._loader = loader
+        self._sync = sync
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._refreshing = False
+        self._lock = threading.Lock()       # guards counters and the refresh flag
+        self._load_lock = threading.Lock()  # serializes catalog loads
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0,
+                      "delta_syncs": 0, "rows_synced": 0, "last_rows_synced": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _refresh(self) -> CatalogSnapshot:
+        # Caller must hold self._load_lock
+        snapshot = self._snapshot
+        if snapshot is not None and self._sync is not None:
+            with span("catalog.sync"):
+                synced = self._sync(snapshot.index)
+            if synced is not None:
+                if synced:
+                    # Cached query results keyed on the old version go stale
+                    self._version += 1
+                    snapshot.version = self._version
+                snapshot.loaded_at = time.monotonic()
+                with self._lock:
+                    self.stats["delta_syncs"] += 1
+                    self.stats["rows_synced"] += synced
+                    self.stats["last_rows_synced"] = synced
+                return snapshot
+
+        with span("catalog.load"):
+            products = self._loader()
+            self._version += 1
+            snapshot = CatalogSnapshot(products, self._version)
+        self._snapshot = snapshot
+        self._count("refreshes")
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                with self._load_lock:
+                    self._refresh()
+            except Exception as e:
+                self._count("refresh_errors")
+                logger.warning("CatalogCache: background refresh failed, serving stale snapshot: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=worker, name="catalog-refresh", daemon=True).start()
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._count("misses")
+            with self._load_lock:
+                # Another caller may have finished the load while we waited
+                snapshot = self._snapshot or self._refresh()
+            return snapshot
+
+        self._count("hits")
+        if time.monotonic() - snapshot.loaded_at > self.ttl:
+            self._refresh_in_background()
+        return snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        """Refresh now, in the calling thread, rather than waiting for the TTL."""
+        with self._load_lock:
+            return self._refresh()
+
+    def get_products(self) -> List[Dict[str, Any]]:
+        return self.snapshot().products
+
+    @property
+    def index(self) -> SearchIndex:
+        """Index of the current snapshot, without counting a cache lookup once loaded."""
+        snapshot = self._snapshot or self.snapshot()
+        return snapshot.index
+
+    @property
+    def version(self) -> int:
+        """Version of the snapshot currently held (0 if nothing is loaded)."""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    def invalidate(self):
+        """Drop the snapshot so the next read loads a fresh copy of the catalog."""
+        self._snapshot = None
@@ -0,0 +1,31 @@
+from contextvars import ContextVar
+from typing import Callable, Optional
+from crewai_flow.tools.catalog_backends import catalog
+from crewai_flow.crew_metrics import span
+
+# The catalog search behind SearchTool. It lives apart from the tool so the
+# app can search without importing crewai; custom_tool re-exports it.
+
+# Set by the flow for the duration of a crew run; SearchTool hands its result
+# to the listener as soon as it has one, before the remaining tasks finish.
+search_listener: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("search_listener", default=None)
+
+def search_catalog(query: str) -> dict:
+    """Search the configured catalog; this is what SearchTool returns to the agent, as a dict."""
+    # 🔹 First Search: Match product names against the query and its plural variation
+    with span("tool.search"):
+        matching_products, categories = catalog.match_products(query)
+    
+    if not matching_products:
+        return {"products": [], "recommended": [], "message": "No matching products found."}
+    
+    # 🔹 Second Search: The few products most similar to the matches, best first
+    with span("tool.recommend"):
+        recommended_products = catalog.recommend(matching_products)
+    
+    # 🔹 Combine results
+    return {
+        "products": matching_products,
+        "recommended_products": recommended_products,
+        "message": f"Products found successfully in categories: {', '.join(categories)}."
+    }
@@ -0,0 +1,366 @@
+"""
+Catalog snapshots that worker processes share through mmap.
+
+One loader process writes the catalog and its search index into a single
+columnar file (write_snapshot, or `python -m crewai_flow.tools.catalog_snapshot`);
+every worker maps it read-only (MmapSnapshot). The pages live once in the
+OS page cache however many workers map them, and opening a snapshot only
+parses its header.
+
+Layout: a header, then 8-byte aligned sections. All strings (IDs, lower-cased
+names, categories and each row's JSON record) sit in one blob addressed by
+an offsets array; rows are columns of string numbers; the trigram index maps
+sorted CRC32 trigram hashes to row postings, and categories map to theirs.
+IDs and names have sorted permutations for binary search, and 64-bit ID
+hashes a sorted one for looking up many IDs at once. The recommender's
+sparse vectors are stored as they are used, so workers map them instead of
+each decoding every row to rebuild them.
+"""
+import argparse, hashlib, json, mmap, os, struct, sys, time, zlib
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from crewai_flow.tools.search_index import query_variations, product_id, NGRAM
+
+MAGIC = b"CATSNAP2"
+SECTIONS = (
+    "blob", "string_offsets", "row_id", "row_name", "row_category", "row_record",
+    "gram_keys", "gram_offsets", "gram_postings",
+    "category_names", "category_offsets", "category_postings",
+    "id_order", "name_order", "id_hashes", "id_hash_order",
+    "rec_row_ptr", "rec_cols", "rec_data", "rec_col_ptr", "rec_col_rows", "rec_col_data",
+)
+# Item type of each section (array/memoryview codes); the rest are uint32
+SECTION_TYPES = {"string_offsets": "Q", "id_hashes": "Q", "rec_row_ptr": "q", "rec_data": "f", "rec_col_ptr": "q", "rec_col_data": "f"}
+# magic, byte order, row count, then (offset, length) per section
+_HEADER = struct.Struct("<8sBI" + "QQ" * len(SECTIONS))
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+NO_CATEGORY = 0xFFFFFFFF
+
+
+def _gram_key(gram: str) -> int:
+    return zlib.crc32(gram.encode("utf-8"))
+
+
+def _id_hash(pid: str) -> int:
+    return int.from_bytes(hashlib.blake2b(pid.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def write_snapshot(path: str, products: Iterable[Dict[str, Any]]):
+    """Write products to a snapshot at path, replacing any existing one atomically."""
+    strings: List[bytes] = []
+
+    def intern(text: str) -> int:
+        strings.append(text.encode("utf-8"))
+        return len(strings) - 1
+
+    ids, seen, records = [], set(), []
+    row_id, row_name, row_category, row_record = (array("I") for _ in range(4))
+    names: List[str] = []
+    grams: Dict[int, List[int]] = defaultdict(list)
+    categories: Dict[str, List[int]] = {}
+    category_strings: Dict[str, int] = {}
+
+    for position, product in enumerate(products):
+        # Same ID rules as SearchIndex, so IDs agree across backends
+        pid = product_id(product)
+        if pid in seen:
+            pid = f"{pid}-{position}"
+        seen.add(pid)
+        ids.append(pid)
+        record = dict(product, id=pid)
+        records.append(record)
+        name = str(record.get("name", "")).lower()
+        names.append(name)
+        category = str(record.get("category", "")).strip()
+
+        row_id.append(intern(pid))
+        row_name.append(intern(name))
+        row_record.append(intern(json.dumps(record)))
+        if category:
+            if category not in category_strings:
+                category_strings[category] = intern(category)
+                categories[category] = []
+            categories[category].append(position)
+            row_category.append(category_strings[category])
+        else:
+            row_category.append(NO_CATEGORY)
+        for key in {_gram_key(gram) for gram in _grams(name)}:
+            grams[key].append(position)
+
+    offsets = array("Q", [0])
+    for encoded in strings:
+        offsets.append(offsets[-1] + len(encoded))
+
+    def postings(table, keys) -> Tuple[array, array]:
+        table_offsets, rows = array("I", [0]), array("I")
+        for key in keys:
+            rows.extend(table[key])
+            table_offsets.append(len(rows))
+        return table_offsets, rows
+
+    gram_keys = array("I", sorted(grams))
+    gram_offsets, gram_postings = postings(grams, gram_keys)
+    category_names = array("I", (category_strings[category] for category in categories))
+    category_offsets, category_postings = postings(categories, list(categories))
+    id_order = array("I", sorted(range(len(ids)), key=ids.__getitem__))
+    name_order = array("I", sorted(range(len(names)), key=lambda i: (names[i], i)))
+    hashed = sorted((_id_hash(pid), position) for position, pid in enumerate(ids))
+    id_hashes = array("Q", (key for key, _ in hashed))
+    id_hash_order = array("I", (position for _, position in hashed))
+    # Imported here so only the loader, not every worker, pays for numpy up front
+    from crewai_flow.tools.recommender import vectors
+    _, vectors_by_name = vectors(records)
+
+    sections = {
+        "blob": b"".join(strings), "string_offsets": offsets,
+        "row_id": row_id, "row_name": row_name, "row_category": row_category, "row_record": row_record,
+        "gram_keys": gram_keys, "gram_offsets": gram_offsets, "gram_postings": gram_postings,
+        "category_names": category_names, "category_offsets": category_offsets,
+        "category_postings": category_postings, "id_order": id_order, "name_order": name_order,
+        "id_hashes": id_hashes, "id_hash_order": id_hash_order,
+    }
+    for name, vector in vectors_by_name.items():
+        sections[f"rec_{name}"] = vector.astype(SECTION_TYPES.get(f"rec_{name}", "I"))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        layout = []
+        for name in SECTIONS:
+            data = sections[name]
+            data = data if isinstance(data, bytes) else data.tobytes()
+            f.write(b"\0" * (-f.tell() % 8))
+            layout += [f.tell(), len(data)]
+            f.write(data)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, _BYTE_ORDER, len(ids), *layout))
+        f.flush()
+        os.fsync(f.fileno())
+    # Workers holding the old file keep their mapping; new opens see the new one
+    os.replace(tmp_path, path)
+
+
+class MmapSnapshot:
+    """
+    A read-only, memory-mapped catalog snapshot.
+
+    Answers the same lookups as SearchIndex, with the same results, decoding
+    rows from the mapping as they are returned.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Identifies this file even after a new snapshot replaces it on disk
+        self.version = (stat.st_ino, stat.st_mtime_ns)
+        magic, byte_order, self._rows, *layout = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or byte_order != _BYTE_ORDER:
+            raise ValueError(f"{path} is not a catalog snapshot for this machine")
+        view = memoryview(self._mmap)
+        for name, offset, length in zip(SECTIONS, layout[::2], layout[1::2]):
+            section = view[offset:offset + length]
+            if name != "blob":
+                section = section.cast(SECTION_TYPES.get(name, "I"))
+            setattr(self, f"_{name}", section)
+        self._recommender = None
+
+    def __len__(self):
+        return self._rows
+
+    def _string(self, number: int) -> str:
+        return str(self._blob[self._string_offsets[number]:self._string_offsets[number + 1]], "utf-8")
+
+    def _name(self, position: int) -> str:
+        return self._string(self._row_name[position])
+
+    def _id(self, position: int) -> str:
+        return self._string(self._row_id[position])
+
+    def _category(self, position: int) -> str:
+        number = self._row_category[position]
+        return "" if number == NO_CATEGORY else self._string(number)
+
+    def _record(self, position: int) -> Dict[str, Any]:
+        return json.loads(self._string(self._row_record[position]))
+
+    def rows(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self._record(position) for position in positions]
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        return self.rows(range(self._rows))
+
+    def _find(self, order, value: str, key) -> Optional[int]:
+        """Position of the first row whose key equals value, by binary search over a sorted permutation."""
+        i = bisect_left(order, value, key=key)
+        if i < len(order) and key(order[i]) == value:
+            return order[i]
+        return None
+
+    def position_of(self, pid: str) -> Optional[int]:
+        return self._find(self._id_order, pid, self._id)
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        position = self.position_of(pid)
+        return None if position is None else self._record(position)
+
+    def resolve(self, ids) -> List[Dict[str, Any]]:
+        positions = (self.position_of(pid) for pid in ids)
+        return [self._record(position) for position in positions if position is not None]
+
+    def ids_for(self, products) -> List[str]:
+        """Catalog IDs for product dicts, by id when the catalog knows it, else the first row with the exact name."""
+        ids = []
+        for product in products:
+            pid = product.get("id")
+            if pid is not None and self.position_of(str(pid)) is not None:
+                ids.append(str(pid))
+                continue
+            position = self._find(self._name_order, str(product.get("name", "")).lower(), self._name)
+            if position is not None:
+                ids.append(self._id(position))
+        return list(dict.fromkeys(ids))
+
+    def _postings(self, key: int):
+        i = bisect_left(self._gram_keys, key)
+        if i == len(self._gram_keys) or self._gram_keys[i] != key:
+            return ()
+        return self._gram_postings[self._gram_offsets[i]:self._gram_offsets[i + 1]]
+
+    def _match_positions(self, text: str) -> set:
+        if len(text) < NGRAM:
+            return {i for i in range(self._rows) if text in self._name(i)}
+        postings = sorted((self._postings(_gram_key(gram)) for gram in _grams(text)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return candidates
+        # Hash collisions and non-contiguous trigrams are weeded out here
+        return {i for i in candidates if text in self._name(i)}
+
+    def match(self, query: str) -> List[int]:
+        positions = set()
+        for variation in query_variations(query):
+            positions |= self._match_positions(variation)
+        return sorted(positions)
+
+    def _category_rows(self, keep) -> set:
+        positions = set()
+        for i, number in enumerate(self._category_names):
+            if keep(self._string(number)):
+                positions.update(self._category_postings[self._category_offsets[i]:self._category_offsets[i + 1]])
+        return positions
+
+    def category_contains(self, text: str) -> List[Dict[str, Any]]:
+        text = text.lower()
+        return self.rows(sorted(self._category_rows(lambda category: text in category.lower())))
+
+    @property
+    def recommender(self):
+        """The Recommender over the stored vectors: NumPy views of the mapping, with IDs looked up in place."""
+        if self._recommender is None:
+            import numpy as np
+            from crewai_flow.tools.recommender import Recommender
+            arrays = {name: np.frombuffer(getattr(self, f"_rec_{name}"), dtype=SECTION_TYPES.get(f"rec_{name}", "I"))
+                      for name in Recommender.ARRAYS}
+            self._recommender = Recommender.from_arrays(_SnapshotIds(self), self.positions_of, arrays)
+        return self._recommender
+
+    def positions_of(self, ids: Iterable[str]):
+        """Row positions of the given IDs that are in the snapshot, as a NumPy array; one vectorized search for all of them."""
+        import numpy as np
+        ids = list(ids)
+        hashes = np.fromiter(map(_id_hash, ids), dtype=np.uint64, count=len(ids))
+        keys = np.frombuffer(self._id_hashes, dtype=np.uint64)
+        found = np.minimum(np.searchsorted(keys, hashes), max(len(keys) - 1, 0))
+        hit = keys[found] == hashes if len(keys) else np.zeros(len(ids), dtype=bool)
+        order = np.frombuffer(self._id_hash_order, dtype=np.uint32)
+        positions = []
+        for pid, i, is_hit in zip(ids, found.tolist(), hit.tolist()):
+            position = int(order[i]) if is_hit else None
+            if position is not None and self._id(position) != pid:
+                # Two IDs share a hash: fall back to the exact search
+                position = self.position_of(pid)
+            if position is not None:
+                positions.append(position)
+        return np.array(positions, dtype=np.int64)
+
+    def match_products(self, query: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Return (matching products, matched categories), without the same-category list."""
+        matches = self.match(query)
+        categories = list(dict.fromkeys(category for category in map(self._category, matches) if category))
+        return self.rows(matches), categories
+
+    def search(self, query: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+        """Return (matching products, same-category recommendations, matched categories)."""
+        matches = self.match(query)
+        categories = list(dict.fromkeys(category for category in map(self._category, matches) if category))
+        wanted = set(categories)
+        recommended = self._category_rows(wanted.__contains__) - set(matches)
+        return self.rows(matches), self.rows(sorted(recommended)), categories
+
+
+class _SnapshotIds(Sequence):
+    """Row IDs, decoded from the snapshot as they are read."""
+
+    def __init__(self, snapshot: MmapSnapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._snapshot._id(i) for i in range(*position.indices(len(self)))]
+        return self._snapshot._id(int(position))
+
+
+def main():
+    """Build (and optionally keep rebuilding) a snapshot from another catalog backend."""
+    parser = argparse.ArgumentParser(description="Write the catalog to a shared mmap snapshot.")
+    parser.add_argument("output", help="snapshot file the workers open (CATALOG_PATH with CATALOG_BACKEND=mmap)")
+    parser.add_argument("--source", default="sheets", help="backend to read from: sheets, csv, parquet or sqlite")
+    parser.add_argument("--source-path", default="", help="file for the csv, parquet and sqlite sources")
+    parser.add_argument("--watch", type=float, default=0, help="re-check the source every N seconds")
+    args = parser.parse_args()
+
+    from crewai_flow.tools.catalog_backends import create_backend
+    source = create_backend(args.source, args.source_path)
+    version, file_stamp = None, None
+    while True:
+        if getattr(source, "path", None):
+            # File sources: a refresh re-reads the whole file and always bumps the
+            # version, so only refresh once the file has been replaced or written to
+            stat = os.stat(source.path)
+            changed = (stat.st_ino, stat.st_size, stat.st_mtime_ns) != file_stamp
+            file_stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        else:
+            changed = True
+        if changed and hasattr(source, "cache"):
+            # In-memory backends: refresh (a delta sync for Sheets) and check whether anything changed
+            source.cache.refresh()
+        if changed and source.version != version:
+            start = time.perf_counter()
+            products = source.load_products() if not hasattr(source, "cache") else source.cache.get_products()
+            write_snapshot(args.output, products)
+            version = source.version
+            print(f"Wrote {len(products)} products to {args.output} in {time.perf_counter() - start:.2f}s")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import hashlib, logging, os
+from typing import Any, Dict, List, Optional
+from crewai_flow.tools.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# A sheet column that changes whenever its row does (e.g. an updated_at
+# timestamp or a checksum kept by the sheet), filled in on every row. When
+# present, a sync reads only this column to find changed rows; otherwise it
+# reads every value.
+FINGERPRINT_COLUMN = os.getenv("CATALOG_FINGERPRINT_COLUMN", "updated_at")
+
+# The columns that say which product a row holds: the first of these the
+# sheet has, else name and category together (what product_id() hashes)
+KEY_COLUMNS = ("id", "sku")
+
+
+def _numericise(value: str) -> Any:
+    # Same conversion get_all_records() applies to each cell
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _row_checksum(values: List[str]) -> str:
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def _runs(positions: List[int]) -> List[List[int]]:
+    """Split sorted row positions into runs of consecutive ones."""
+    runs = []
+    for position in positions:
+        if runs and position == runs[-1][-1] + 1:
+            runs[-1].append(position)
+        else:
+            runs.append([position])
+    return runs
+
+
+class SheetSync:
+    """
+    Keeps a SearchIndex in step with a worksheet by fetching only what changed.
+
+    A sync first compares the spreadsheet's modification time and stops there
+    if nothing changed. Otherwise it compares per-row fingerprints (the
+    FINGERPRINT_COLUMN when the sheet has one, else checksums of every row)
+    with the ones seen last time, fetches the changed rows in one batch_get
+    and applies them to the index in place.
+
+    Fingerprints are compared by position, so a sync also checks each row
+    still holds the product it held before. A row deleted or inserted above
+    the end of the sheet shifts the rows below it, and the sheet is then
+    loaded in full instead; rows appended at the end still sync as a delta.
+    """
+
+    def __init__(self, worksheet, fingerprint_column: str = FINGERPRINT_COLUMN):
+        self.worksheet = worksheet
+        self.fingerprint_column = fingerprint_column
+        self._header: Optional[List[str]] = None
+        self._fingerprints: Optional[List[str]] = None
+        self._keys: Optional[List[tuple]] = None
+        self._modified: Optional[str] = None
+        self.stats = {"syncs": 0, "full_loads": 0, "rows_fetched": 0, "rows_synced": 0, "last_rows_synced": 0}
+
+    def _modified_time(self) -> Optional[str]:
+        spreadsheet = getattr(self.worksheet, "spreadsheet", None)
+        try:
+            # gspread 6 has get_lastUpdateTime(); 5.x exposes a lastUpdateTime property
+            if hasattr(spreadsheet, "get_lastUpdateTime"):
+                return spreadsheet.get_lastUpdateTime()
+            return getattr(spreadsheet, "lastUpdateTime", None)
+        except Exception as e:
+            # Without Drive metadata every sync falls through to the fingerprints
+            logger.warning("Could not read sheet modification time: %s", e)
+            return None
+
+    def _record(self, values: List[str]) -> Dict[str, Any]:
+        values = list(values) + [""] * (len(self._header) - len(values))
+        return {key: _numericise(value) for key, value in zip(self._header, values) if key}
+
+    def _fingerprint_index(self) -> Optional[int]:
+        try:
+            return self._header.index(self.fingerprint_column)
+        except ValueError:
+            return None
+
+    def _key_indexes(self) -> List[int]:
+        for name in KEY_COLUMNS:
+            if name in self._header:
+                return [self._header.index(name)]
+        return [self._header.index(name) for name in ("name", "category") if name in self._header]
+
+    @staticmethod
+    def _row_key(row: List[str], columns: List[int]) -> tuple:
+        return tuple(row[column] if column < len(row) else "" for column in columns)
+
+    def _read_keys(self, count: int) -> List[tuple]:
+        """The key of each of the first count data rows, read a column at a time."""
+        columns = []
+        for column in self._key_indexes():
+            values = self.worksheet.col_values(column + 1)[1:count + 1]
+            columns.append(values + [""] * (count - len(values)))
+        return list(zip(*columns)) if columns else [()] * count
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Read the whole sheet, remembering its fingerprints for the next sync."""
+        modified = self._modified_time()
+        values = self.worksheet.get_all_values()
+        self._header = values[0] if values else []
+        rows = values[1:]
+        column = self._fingerprint_index()
+        if column is None:
+            self._fingerprints = [_row_checksum(row) for row in rows]
+        else:
+            self._fingerprints = [row[column] if column < len(row) else "" for row in rows]
+        key_columns = self._key_indexes()
+        self._keys = [self._row_key(row, key_columns) for row in rows]
+        self._modified = modified
+        self.stats["full_loads"] += 1
+        self.stats["rows_fetched"] += len(rows)
+        return [self._record(row) for row in rows]
+
+    def sync(self, index: SearchIndex) -> Optional[int]:
+        """
+        Apply the sheet's changes since the last load or sync to index.
+
+        Returns the number of rows updated, or None when the sheet has to be
+        loaded in full (nothing loaded yet, the header row changed, or rows
+        were inserted or deleted above the end of the sheet).
+        """
+        if self._fingerprints is None:
+            return None
+        modified = self._modified_time()
+        if modified is not None and modified == self._modified:
+            self._finish(0, 0)
+            return 0
+
+        if self.worksheet.row_values(1) != self._header:
+            logger.info("Sheet header changed; reloading the whole catalog")
+            return None
+
+        column = self._fingerprint_index()
+        if column is None:
+            rows = self.worksheet.get_all_values()[1:]
+            fingerprints = [_row_checksum(row) for row in rows]
+            key_columns = self._key_indexes()
+            keys = [self._row_key(row, key_columns) for row in rows]
+            fetched = len(rows)
+        else:
+            # Only the fingerprint and key columns; data rows start below the header
+            fingerprints = self.worksheet.col_values(column + 1)[1:]
+            keys = self._read_keys(len(fingerprints))
+            rows, fetched = {}, 0
+
+        # A row that now holds another product means rows moved: the index is
+        # positional, so patching it would put changes against the wrong rows.
+        # Without an id column an edited name also counts, at the cost of a reload.
+        common = min(len(keys), len(self._keys))
+        if keys[:common] != self._keys[:common]:
+            logger.info("Sheet rows were inserted or deleted; reloading the whole catalog")
+            return None
+
+        previous = self._fingerprints
+        changed = [position for position, fingerprint in enumerate(fingerprints)
+                   if position >= len(previous) or fingerprint != previous[position]]
+
+        if column is not None and changed:
+            # One request for every changed run of rows; sheet rows are 1-based under the header
+            runs = _runs(changed)
+            blocks = self.worksheet.batch_get([f"{run[0] + 2}:{run[-1] + 2}" for run in runs])
+            rows = {}
+            for run, block in zip(runs, blocks):
+                # The API leaves out empty trailing rows of a range
+                block = list(block) + [[]] * (len(run) - len(block))
+                rows.update(zip(run, block))
+            fetched = len(changed)
+        changes = {position: self._record(rows[position]) for position in changed}
+
+        index.apply(changes, len(fingerprints))
+        self._fingerprints = fingerprints
+        self._keys = keys
+        self._modified = modified
+        # Dropped rows count as synced too
+        synced = len(changes) + max(0, len(previous) - len(fingerprints))
+        self._finish(synced, fetched)
+        return synced
+
+    def _finish(self, synced: int, fetched: int):
+        self.stats["syncs"] += 1
+        self.stats["rows_fetched"] += fetched
+        self.stats["rows_synced"] += synced
+        self.stats["last_rows_synced"] = synced
+        logger.info("Catalog sync: %d rows changed, %d rows fetched", synced, fetched)
+
@@ -0,0 +1,219 @@
+"""
+Ranked "you might also like" products, computed locally.
+
+Every product is a TF-IDF vector over its name words, category, description
+words and price band. A search's matches are summed into one query vector
+and the k products with the highest cosine similarity to it are recommended.
+Vectors are kept sparse in NumPy arrays, so a query is a handful of
+vectorized gathers and one bincount over the postings of the query's
+features; nothing leaves the process.
+"""
+import logging, math, os, re, threading, time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from crewai_flow.crew_metrics import span
+
+logger = logging.getLogger(__name__)
+
+# How many recommendations a search returns
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "5"))
+
+# How much each field counts towards similarity, before IDF weighting
+FIELD_WEIGHTS = {"name": 1.0, "category": 1.5, "description": 0.5, "price": 0.75}
+
+_WORD = re.compile(r"[a-z][a-z']+")
+
+
+def _words(text: Any) -> List[str]:
+    return _WORD.findall(str(text or "").lower())
+
+
+def _price_band(price: Any) -> Optional[int]:
+    """Prices bucketed by powers of two, so $400 and $450 share a band and $40 does not."""
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        return None
+    return int(math.log2(price)) if price >= 1 else 0
+
+
+def features(product: Dict[str, Any]) -> Dict[str, float]:
+    """The weighted features of one product, before IDF."""
+    weights: Dict[str, float] = {}
+    for word in _words(product.get("name")):
+        weights[f"n:{word}"] = weights.get(f"n:{word}", 0) + FIELD_WEIGHTS["name"]
+    category = str(product.get("category", "")).strip().lower()
+    if category:
+        weights[f"c:{category}"] = FIELD_WEIGHTS["category"]
+    for word in set(_words(product.get("description"))):
+        weights[f"d:{word}"] = FIELD_WEIGHTS["description"]
+    band = _price_band(product.get("price"))
+    if band is not None:
+        weights[f"p:{band}"] = FIELD_WEIGHTS["price"]
+    return weights
+
+
+def vectors(products: Iterable[Dict[str, Any]]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    The product IDs and the arrays a Recommender works from, named as in
+    Recommender.ARRAYS; what a catalog snapshot stores so workers need not
+    rebuild them.
+    """
+    vocabulary: Dict[str, int] = {}
+    ids: List[str] = []
+    row_ptr, cols, vals = array("q", [0]), array("q"), array("d")
+    for product in products:
+        ids.append(str(product["id"]))
+        for feature, weight in features(product).items():
+            cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+            vals.append(weight)
+        row_ptr.append(len(cols))
+
+    rows = len(ids)
+    row_ptr = np.frombuffer(row_ptr, dtype=np.int64)
+    cols = np.frombuffer(cols, dtype=np.int64)
+    data = np.frombuffer(vals, dtype=np.float64).copy()
+    row_of = np.repeat(np.arange(rows), np.diff(row_ptr))
+
+    # Rare features say more about a product than ones every product has
+    df = np.bincount(cols, minlength=len(vocabulary))
+    data *= np.log((1 + rows) / (1 + df[cols])) + 1
+    norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=rows))
+    data /= np.maximum(norms, 1e-12)[row_of]
+    data = data.astype(np.float32)
+
+    order = np.argsort(cols, kind="stable")
+    return ids, {
+        "row_ptr": row_ptr, "cols": cols, "data": data,
+        "col_ptr": np.concatenate(([0], np.cumsum(df))), "col_rows": row_of[order], "col_data": data[order],
+    }
+
+
+class Recommender:
+    """
+    Cosine similarity over TF-IDF product vectors.
+
+    The vectors are stored twice: by row (to build a query from products) and
+    by feature (to score every product that shares a feature with the query).
+    """
+    ARRAYS = ("row_ptr", "cols", "data", "col_ptr", "col_rows", "col_data")
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        ids, arrays = vectors(products)
+        self.position = {pid: i for i, pid in enumerate(ids)}
+        self._attach(ids, self._positions_in_dict, arrays)
+
+    @classmethod
+    def from_arrays(cls, ids: Sequence[str], positions_of: Callable[[Iterable[str]], np.ndarray],
+                    arrays: Dict[str, np.ndarray]) -> "Recommender":
+        """
+        A recommender over prebuilt arrays, e.g. views of a mapped snapshot;
+        nothing is copied. positions_of maps IDs to the row positions of the
+        ones it knows.
+        """
+        recommender = cls.__new__(cls)
+        recommender._attach(ids, positions_of, arrays)
+        return recommender
+
+    def _attach(self, ids: Sequence[str], positions_of: Callable[[Iterable[str]], np.ndarray],
+                arrays: Dict[str, np.ndarray]):
+        self.ids = ids
+        self._positions_of = positions_of
+        for name in self.ARRAYS:
+            setattr(self, f"_{name}", arrays[name])
+
+    def _positions_in_dict(self, ids: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.position[pid] for pid in ids if pid in self.position), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _gather(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """The indices of every [start, end) range, concatenated."""
+        lengths = ends - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(total)
+
+    def similar(self, ids: Iterable[str], k: Optional[int] = None) -> List[str]:
+        """Up to k (default RECOMMEND_TOP_K) other products most similar to the given ones, most similar first."""
+        k = RECOMMEND_TOP_K if k is None else k
+        positions = self._positions_of(ids)
+        if not len(positions) or k <= 0:
+            return []
+
+        # The query: the sum of the given products' vectors
+        entries = self._gather(self._row_ptr[positions], self._row_ptr[positions + 1])
+        query_features, inverse = np.unique(self._cols[entries], return_inverse=True)
+        query = np.bincount(inverse, weights=self._data[entries])
+
+        # Dot product with every product sharing a feature with the query
+        starts, ends = self._col_ptr[query_features], self._col_ptr[query_features + 1]
+        entries = self._gather(starts, ends)
+        weights = self._col_data[entries] * np.repeat(query, ends - starts)
+        scores = np.bincount(self._col_rows[entries], weights=weights, minlength=len(self.ids))
+        scores[positions] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        # Ties keep catalog order, like every other list the catalog returns
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [self.ids[i] for i in ranked]
+
+
+class RecommenderCache:
+    """
+    The recommender for the current catalog version.
+
+    The first call builds it; after the catalog changes, the old one keeps
+    answering (skipping products that have gone) while a background thread
+    builds the new one.
+    """
+
+    def __init__(self, load: Callable[[], List[Dict[str, Any]]], version: Callable[[], Any]):
+        self._load = load
+        self._version = version
+        self._current: Optional[Recommender] = None
+        self._built_for = None
+        self._building = False
+        self._lock = threading.Lock()
+        self.stats = {"builds": 0, "build_errors": 0, "last_build_s": 0.0}
+
+    def _build(self) -> Recommender:
+        start = time.perf_counter()
+        with span("recommender.build"):
+            products = self._load()
+            # Read after loading: the load itself may be what sets the version
+            version = self._version()
+            recommender = Recommender(products)
+        self._current, self._built_for = recommender, version
+        self.stats["builds"] += 1
+        self.stats["last_build_s"] = time.perf_counter() - start
+        return recommender
+
+    def _build_in_background(self):
+        def worker():
+            try:
+                self._build()
+            except Exception as e:
+                self.stats["build_errors"] += 1
+                logger.error("Recommender: rebuild failed, keeping the previous one: %s", e)
+            finally:
+                self._building = False
+        threading.Thread(target=worker, name="recommender-build", daemon=True).start()
+
+    def get(self) -> Recommender:
+        version = self._version()
+        current = self._current
+        if current is not None and self._built_for == version:
+            return current
+        with self._lock:
+            if self._current is None:
+                return self._build()
+            if self._built_for != version and not self._building:
+                self._building = True
+                self._build_in_background()
+            return self._current
@@ -0,0 +1,208 @@
+import hashlib, threading
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Tuple
+
+NGRAM = 3
+
+
+def query_variations(query: str) -> List[str]:
+    """The query plus its singular/plural variation, as SearchTool matches them."""
+    query = query.lower()
+    if query.endswith('s'):
+        return [query, query[:-1]]  # Remove 's' for plural
+    return [query, query + 's']     # Add 's' for singular
+
+
+def product_id(product: Dict[str, Any]) -> str:
+    """Stable ID for a catalog row: its own id/sku column, else a hash of name and category."""
+    for key in ("id", "sku"):
+        value = product.get(key)
+        if value not in (None, ""):
+            return str(value)
+    key = f"{product.get('name', '')}|{product.get('category', '')}".lower()
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _discard(table: Dict[str, Set[int]], key: str, position: int):
+    rows = table.get(key)
+    if rows is not None:
+        rows.discard(position)
+        if not rows:
+            del table[key]
+
+
+class SearchIndex:
+    """
+    Prebuilt lookup structures over one catalog snapshot.
+
+    Names are indexed by character trigrams so a substring query only has to
+    verify the rows that share all of its trigrams, and categories map straight
+    to their rows. Results keep the catalog's row order. Rows can be replaced,
+    appended or dropped in place with apply(), so a sync only re-indexes the
+    rows that changed.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self.ids: List[str] = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self._names: List[str] = []
+        self._categories: List[str] = []
+        self._by_name: Dict[str, Set[int]] = defaultdict(set)
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._by_category: Dict[str, Set[int]] = defaultdict(set)
+        # Searches run on worker threads while a sync may be updating rows
+        self._lock = threading.RLock()
+
+        for position, product in enumerate(products):
+            self.ids.append("")
+            self._names.append("")
+            self._categories.append("")
+            self._index_row(position, product)
+
+    def __len__(self):
+        return len(self.products)
+
+    def _index_row(self, position: int, product: Dict[str, Any]):
+        pid = product_id(product)
+        if pid in self.by_id:
+            # Duplicate rows still need distinct IDs
+            pid = f"{pid}-{position}"
+        # Rows carry their catalog ID from here on, whether or not the sheet had one
+        product["id"] = pid
+        self.products[position] = product
+        self.ids[position] = pid
+        self.by_id[pid] = product
+
+        name = str(product.get('name', "")).lower()
+        self._names[position] = name
+        self._by_name[name].add(position)
+        for gram in _ngrams(name):
+            self._grams[gram].add(position)
+
+        category = str(product.get("category", "")).strip()
+        self._categories[position] = category
+        if category:
+            self._by_category[category].add(position)
+
+    def _unindex_row(self, position: int):
+        self.by_id.pop(self.ids[position], None)
+        name = self._names[position]
+        _discard(self._by_name, name, position)
+        for gram in _ngrams(name):
+            _discard(self._grams, gram, position)
+        _discard(self._by_category, self._categories[position], position)
+
+    def apply(self, changes: Dict[int, Dict[str, Any]], length: int):
+        """
+        Update rows in place. changes maps row positions to their new rows and
+        length is the new row count: rows past it are dropped, and changed
+        positions past the old end are appended. Untouched rows keep their
+        IDs, even where a full rebuild would number duplicates differently.
+        """
+        with self._lock:
+            for position in range(length, len(self.products)):
+                self._unindex_row(position)
+            for column in (self.products, self.ids, self._names, self._categories):
+                del column[length:]
+
+            for position in sorted(changes):
+                if position < len(self.products):
+                    self._unindex_row(position)
+                else:
+                    # Appended rows arrive in order, so this is always the next position
+                    self.products.append({})
+                    self.ids.append("")
+                    self._names.append("")
+                    self._categories.append("")
+                self._index_row(position, changes[position])
+
+    def resolve(self, ids) -> List[Dict[str, Any]]:
+        """Catalog rows for the given IDs, skipping any no longer in the catalog."""
+        by_id = self.by_id
+        return [by_id[pid] for pid in ids if pid in by_id]
+
+    def ids_for(self, products) -> List[str]:
+        """
+        Catalog IDs for product dicts, e.g. ones echoed back by the LLM.
+
+        Uses the product's id when the catalog knows it, else the first row
+        with its exact name; products matching neither are dropped.
+        """
+        ids = []
+        with self._lock:
+            for product in products:
+                pid = product.get("id")
+                if pid is not None and str(pid) in self.by_id:
+                    ids.append(str(pid))
+                    continue
+                positions = self._by_name.get(str(product.get("name", "")).lower())
+                if positions:
+                    ids.append(self.ids[min(positions)])
+        return list(dict.fromkeys(ids))
+
+    def _match_positions(self, text: str) -> set:
+        if len(text) < NGRAM:
+            # Too short to have a trigram; fall back to checking every name
+            return {i for i, name in enumerate(self._names) if text in name}
+
+        postings = sorted((self._grams.get(gram, ()) for gram in _ngrams(text)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return candidates
+        # Sharing trigrams does not guarantee a contiguous match
+        return {i for i in candidates if text in self._names[i]}
+
+    def match(self, query: str) -> List[int]:
+        """Row positions whose name contains the query or its plural variation."""
+        positions = set()
+        with self._lock:
+            for variation in query_variations(query):
+                positions |= self._match_positions(variation)
+        return sorted(positions)
+
+    def in_categories(self, categories, exclude=()) -> List[int]:
+        """Row positions in any of the given categories, minus the excluded positions."""
+        exclude = set(exclude)
+        positions = set()
+        with self._lock:
+            for category in categories:
+                positions.update(i for i in self._by_category.get(category, ()) if i not in exclude)
+        return sorted(positions)
+
+    def category_contains(self, text: str) -> List[Dict[str, Any]]:
+        """Products whose category contains the text, case-insensitively."""
+        text = text.lower()
+        positions = set()
+        with self._lock:
+            for category, rows in self._by_category.items():
+                if text in category.lower():
+                    positions.update(rows)
+            return [self.products[i] for i in sorted(positions)]
+
+    def match_products(self, query: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Return (matching products, matched categories), without the same-category list."""
+        with self._lock:
+            matches = self.match(query)
+            categories = list(dict.fromkeys(self._categories[i] for i in matches if self._categories[i]))
+            return [self.products[i] for i in matches], categories
+
+    def search(self, query: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+        """Return (matching products, same-category recommendations, matched categories)."""
+        with self._lock:
+            matches = self.match(query)
+            categories = list(dict.fromkeys(self._categories[i] for i in matches if self._categories[i]))
+            recommended = self.in_categories(categories, exclude=matches)
+            return (
+                [self.products[i] for i in matches],
+                [self.products[i] for i in recommended],
+                categories,
+            )
@@ -0,0 +1,71 @@
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_state import Cart, ShoppingState
+
+CHAIR = {"id": "P1", "name": "Oak Chair", "price": 19.99}
+LAMP = {"id": "P2", "name": "Floor Lamp", "price": "45.50"}
+RUG = {"id": "P3", "name": "Wool Rug", "price": 120}
+
+
+def resummed(cart: Cart):
+    """The totals summed from the lines, to check the running ones against."""
+    lines = list(cart.lines())
+    return sum(item.unit_price_cents * item.quantity for item in lines) / 100, sum(item.quantity for item in lines)
+
+
+def test_totals_follow_add_update_and_remove():
+    cart = Cart()
+    cart.add(CHAIR)
+    cart.add(LAMP, 2)
+    assert (cart.subtotal, cart.item_count) == (110.99, 3)
+
+    # Adding a product already in the cart raises its quantity
+    cart.add(CHAIR, 2)
+    assert len(cart) == 2 and cart.get("P1").quantity == 3
+    assert (cart.subtotal, cart.item_count) == (150.97, 5)
+
+    cart.update("P2", 1)
+    assert (cart.subtotal, cart.item_count) == (105.47, 4)
+
+    cart.add_many([(RUG, 1), (LAMP, 1)])
+    assert (cart.subtotal, cart.item_count) == resummed(cart) == (270.97, 6)
+
+    removed = cart.remove("P1")
+    assert removed.quantity == 3 and "P1" not in cart
+    assert (cart.subtotal, cart.item_count) == resummed(cart) == (211.0, 3)
+
+
+def test_quantity_zero_drops_out_of_the_totals():
+    cart = Cart()
+    cart.add(CHAIR, 2)
+    cart.add(RUG)
+
+    cart.update("P1", 0)
+    assert (cart.subtotal, cart.item_count) == resummed(cart) == (120.0, 1)
+    # Back up from zero, then out of the cart
+    cart.update("P1", 1)
+    assert (cart.subtotal, cart.item_count) == (139.99, 2)
+    cart.update("P1", 0)
+    cart.remove("P1")
+    assert (cart.subtotal, cart.item_count) == (120.0, 1)
+
+    cart.clear()
+    assert (len(cart), cart.subtotal, cart.item_count) == (0, 0, 0)
+
+
+def test_saved_cart_rebuilds_its_totals():
+    state = ShoppingState()
+    state.cart.add(CHAIR, 3)
+    state.cart.add(LAMP)
+
+    restored = ShoppingState.model_validate_json(state.model_dump_json())
+
+    assert list(restored.cart.items) == ["P1", "P2"]
+    assert (restored.cart.subtotal, restored.cart.item_count) == (105.47, 4)
+    # The rebuilt totals keep tracking later changes
+    restored.cart.remove("P1")
+    assert (restored.cart.subtotal, restored.cart.item_count) == (45.5, 1)
+    # Lines are resolved by the names captured when they were added
+    assert restored.cart.resolve("lamp").match == "P2"
@@ -0,0 +1,86 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fixtures import FakeWorksheet, make_products, QUERIES
+from crewai_flow.tools.catalog_sync import SheetSync
+from crewai_flow.tools.search_index import SearchIndex
+
+COLUMNS = ["id", "name", "category", "price", "description"]
+
+
+def make_sheet(fingerprinted: bool):
+    header = COLUMNS + ["updated_at"] if fingerprinted else COLUMNS
+    rows = [[p[key] for key in COLUMNS] + ([0] if fingerprinted else []) for p in make_products(40)]
+    return FakeWorksheet(header, rows)
+
+
+def row(sheet, pid, name, category, price, stamp=1):
+    values = [pid, name, category, price, "Edited."]
+    return values + [stamp] if "updated_at" in sheet._values[0] else values
+
+
+def assert_matches_full_load(index, sheet):
+    rebuilt = SearchIndex(SheetSync(sheet).load())
+    for query in QUERIES + ["rattan sofa", "side table"]:
+        assert index.search(query) == rebuilt.search(query), query
+
+
+@pytest.fixture(params=[True, False], ids=["fingerprint-column", "checksums"])
+def synced(request):
+    sheet = make_sheet(request.param)
+    sync = SheetSync(sheet)
+    return sheet, sync, SearchIndex(sync.load())
+
+
+def test_nothing_changed(synced):
+    sheet, sync, index = synced
+    assert sync.sync(index) == 0
+    assert sync.stats["rows_fetched"] == 40  # only the initial load
+
+
+def test_update_and_append_sync_as_a_delta(synced):
+    sheet, sync, index = synced
+    pid = sheet._values[6][0]
+    sheet.update_row(5, row(sheet, pid, "Nordic Rattan Sofa 5", "Seating", "12.5"))
+    sheet.append_row(row(sheet, "NEW1", "Walnut Side Table 99", "Tables", "149"))
+
+    assert sync.sync(index) == 2
+    assert index.by_id[pid]["price"] == 12.5
+    assert index.by_id["NEW1"]["name"] == "Walnut Side Table 99"
+    assert_matches_full_load(index, sheet)
+    if "updated_at" in sheet._values[0]:
+        # Only the changed rows were fetched
+        assert sync.stats["last_rows_synced"] == 2 and sync.stats["rows_fetched"] == 42
+
+
+def test_deleting_the_last_row_syncs_as_a_delta(synced):
+    sheet, sync, index = synced
+    pid = sheet._values[-1][0]
+    sheet.delete_row(39)
+
+    assert sync.sync(index) == 1
+    assert pid not in index.by_id and len(index.products) == 39
+    assert_matches_full_load(index, sheet)
+
+
+@pytest.mark.parametrize("edit", ["insert", "delete"])
+def test_rows_moved_mid_sheet_need_a_full_load(synced, edit):
+    sheet, sync, index = synced
+    if edit == "insert":
+        sheet.insert_row(10, row(sheet, "INS1", "Walnut Side Table 98", "Tables", "149"))
+    else:
+        sheet.delete_row(10)
+
+    # Patching by position would put the rows below against the wrong products
+    assert sync.sync(index) is None
+    index = SearchIndex(sync.load())
+    assert len(index.products) == (41 if edit == "insert" else 39)
+    assert_matches_full_load(index, sheet)
+    # Back to deltas after the reload
+    sheet.append_row(row(sheet, "NEW2", "Oak Bench 97", "Seating", "80"))
+    assert sync.sync(index) == 1
+    assert_matches_full_load(index, sheet)
@@ -0,0 +1,62 @@
+import asyncio, os, sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_checkout import CheckoutService, cart_idempotency_key
+from crewai_flow.crew_state import CartItem
+
+CART = [CartItem(product_id="P1", name="Oak Chair", unit_price_cents=1999, quantity=2)]
+
+
+class FakeSessions:
+    """Checkout Sessions as Stripe keeps them: one per idempotency key."""
+
+    def __init__(self):
+        self.by_key = {}
+        self.by_id = {}
+
+    async def create_async(self, params, options):
+        key = options["idempotency_key"]
+        if key not in self.by_key:
+            session_id = f"cs_{len(self.by_key)}"
+            session = SimpleNamespace(id=session_id, url=f"https://checkout.test/{session_id}", status="open")
+            self.by_key[key] = self.by_id[session_id] = session
+        return self.by_key[key]
+
+    async def retrieve_async(self, session_id):
+        return self.by_id[session_id]
+
+
+def make_service():
+    service = CheckoutService(api_key="sk_test")
+    sessions = FakeSessions()
+    service._client = SimpleNamespace(v1=SimpleNamespace(checkout=SimpleNamespace(sessions=sessions)))
+    return service, sessions
+
+
+def test_key_changes_with_cart_and_attempt():
+    key = cart_idempotency_key("owner", CART)
+    assert cart_idempotency_key("owner", list(CART)) == key
+    assert cart_idempotency_key("owner", [CART[0].model_copy(update={"quantity": 3})]) != key
+    assert cart_idempotency_key("owner", CART, attempt=1) != key
+
+
+def test_new_session_once_the_last_one_is_finished():
+    service, sessions = make_service()
+
+    async def checkout(attempt):
+        return await service.create_session(CART, "https://shop.test/ok", "https://shop.test/cancel",
+                                            owner="owner", attempt=attempt)
+
+    async def scenario():
+        first = await checkout(0)
+        # A double click gets the same session back
+        assert (await checkout(0)) is first
+        assert not await service.session_finished(first.id)
+        first.status = "complete"
+        assert await service.session_finished(first.id)
+        second = await checkout(1)
+        assert second.id != first.id
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fixtures import make_products, write_csv
+from stub_llm import StubLLM
+
+
+def test_reused_crew_runs_like_a_fresh_one(tmp_path, monkeypatch):
+    catalog_path = tmp_path / "catalog.csv"
+    write_csv(str(catalog_path), make_products(50))
+    monkeypatch.setenv("CATALOG_BACKEND", "csv")
+    monkeypatch.setenv("CATALOG_PATH", str(catalog_path))
+    from crewai_flow import crew_pipeline
+    from crewai_flow.crew_metrics import metrics
+    from crewai_flow.crews.shopping_crew.crew_pool import CrewPool, build_search_crew
+    from crewai_flow.crews.shopping_crew.shopping_crew import ShoppingCrew
+    from crewai_flow.tools import catalog_backends, catalog_search
+
+    backend = catalog_backends.create_backend("csv", str(catalog_path))
+    monkeypatch.setattr(catalog_search, "catalog", backend)
+    llm = StubLLM(latency=0, max_calls=100)
+    monkeypatch.setattr(ShoppingCrew, "llm", llm)
+    # One crew, so every run after the first reuses it
+    pool = CrewPool(size=1, factory=build_search_crew)
+    monkeypatch.setitem(crew_pipeline.crew_pools, "single", pool)
+
+    calls = []
+    for _ in range(4):
+        before = llm.calls
+        payload = crew_pipeline.run_search_pipeline("what would be a comfy sofa", mode="single")
+        calls.append(llm.calls - before)
+        assert payload and payload["products"]
+
+    assert pool.stats["built"] == 1
+    # Token usage is counted per pipeline mode and crew
+    assert "tokens.single.single" in metrics.counters()
+    # Tool call, then final answer: no run inherits the previous run's tool counters
+    assert calls == [calls[0]] * 4
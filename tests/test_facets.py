@@ -0,0 +1,42 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_facets import FacetIndex, apply_facet_command
+from crewai_flow.crew_state import Facets
+
+PRODUCTS = [{"id": f"P{price}", "category": "Seating", "price": price} for price in (50, 800, 1500, 2500)]
+
+
+def run(*commands):
+    facets, notes = Facets(), []
+    for command in commands:
+        facets, note = apply_facet_command(facets, command)
+        notes.append(note)
+    return facets, notes
+
+
+def test_bounds_compose():
+    facets, notes = run("filter over 100", "filter under 2000")
+    assert (facets.price_min, facets.price_max) == (100, 2000)
+    assert notes == ["", ""]
+    assert FacetIndex(PRODUCTS).select(facets) == ["P800", "P1500"]
+
+
+@pytest.mark.parametrize("commands, bounds", [
+    (("filter under 1000", "filter over 2000"), (2000, None)),
+    (("filter over 2000", "filter under 1000"), (None, 1000)),
+    (("filter between 100 and 500", "filter over 900"), (900, None)),
+])
+def test_contradictory_bound_replaces_the_other(commands, bounds):
+    facets, notes = run(*commands)
+    assert (facets.price_min, facets.price_max) == bounds
+    assert notes[-1].startswith("No price is both")
+    assert FacetIndex(PRODUCTS).select(facets)
+
+
+def test_unknown_command_is_rejected():
+    with pytest.raises(ValueError):
+        apply_facet_command(Facets(), "filter colour red")
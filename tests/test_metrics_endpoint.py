@@ -0,0 +1,29 @@
+import asyncio, json, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fixtures import make_products, write_csv
+
+
+def test_metrics_endpoint_returns_json(tmp_path, monkeypatch):
+    catalog_path = tmp_path / "catalog.csv"
+    write_csv(str(catalog_path), make_products(50))
+    # The shared catalog and session store are created on import, possibly by an
+    # earlier test with other settings, so the catalog is also replaced below
+    monkeypatch.setenv("CATALOG_BACKEND", "csv")
+    monkeypatch.setenv("CATALOG_PATH", str(catalog_path))
+    monkeypatch.setenv("SESSION_DB_PATH", "")
+    monkeypatch.chdir(tmp_path)  # chainlit writes its default config to the working directory
+    from crewai_flow import main
+    from crewai_flow.tools import catalog_backends
+
+    backend = catalog_backends.create_backend("csv", str(catalog_path))
+    monkeypatch.setattr(catalog_backends, "catalog", backend)
+    monkeypatch.setattr(main, "catalog", backend)
+
+    report = asyncio.run(main.metrics_endpoint())
+
+    assert isinstance(report["query_cache"]["hit_rate"], float)
+    assert report["catalog"]["backend"] == "csv"
+    json.dumps(report)
@@ -0,0 +1,80 @@
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from crewai_flow.crew_session_store import SessionStore
+from crewai_flow.crew_sessions import SessionRegistry
+from crewai_flow.crew_state import ShoppingState
+
+CHAIR = {"id": "P1", "name": "Oak Chair", "price": 19.99}
+
+
+class FakeFlow:
+    """The part of ShoppingFlow the registry uses."""
+
+    def __init__(self):
+        self.state = ShoppingState()
+
+    def restore(self, state):
+        self.state = state
+
+
+def make_state() -> ShoppingState:
+    state = ShoppingState(user_query="chair", search_result_ids=["P1", "P2"])
+    state.cart.add(CHAIR, 2)
+    state.facets.price_max = 100
+    return state
+
+
+def test_state_round_trips_through_sqlite(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path, flush_interval=3600)
+    state = make_state()
+
+    store.save("s1", state)
+    state.cart.add(CHAIR)
+    store.save("s1", state)
+    # Queued, not yet written, but already what a load sees
+    assert store.load("s1").cart.item_count == 3
+    store.flush()
+    assert store.stats["rows_written"] == 1  # two saves between flushes, one write
+    store.close()
+
+    # A new process reading the same file
+    restored = SessionStore(path, flush_interval=3600).load("s1")
+    assert restored.checkout_owner == state.checkout_owner
+    assert restored.search_result_ids == ["P1", "P2"]
+    assert restored.facets.price_max == 100
+    assert (restored.cart.subtotal, restored.cart.item_count) == (59.97, 3)
+    assert SessionStore(path).load("unknown") is None
+
+
+def test_evicted_session_is_saved_and_restored(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), flush_interval=3600)
+    sessions = SessionRegistry(FakeFlow, max_sessions=1, store=store)
+
+    flow = sessions.get("s1")
+    flow.state = make_state()
+    owner = flow.state.checkout_owner
+    # A second session pushes the first out of memory mid-turn
+    sessions.get("s2")
+    assert "s1" not in sessions
+    flow.state.cart.add(CHAIR)
+    sessions.persist("s1", flow)
+    store.flush()
+
+    restored = sessions.get("s1")
+    assert restored is not flow
+    assert restored.state.checkout_owner == owner
+    assert restored.state.cart.item_count == 3
+
+
+def test_idle_session_is_saved_when_dropped(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), flush_interval=3600)
+    sessions = SessionRegistry(FakeFlow, idle_seconds=-1, store=store)
+
+    sessions.get("s1").state = make_state()
+    sessions.get("s2")  # past the idle limit, so s1 is dropped
+    assert "s1" not in sessions
+
+    assert store.load("s1").cart.item_count == 2